@@ -11,8 +11,15 @@ Enhanced Account Activity Monitor
 
 import requests
 import os
+import re
 import time
-from datetime import datetime
+import hashlib
+import sqlite3
+import threading
+import atexit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from collections import defaultdict
 import pandas as pd
 import smtplib
@@ -21,8 +28,11 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 import json
 
+from http_client import create_session
+from jsonl_log import append_jsonl, load_jsonl
+
 # PostHog Configuration
-POSTHOG_HOST = "https://us.posthog.com"
+POSTHOG_HOST = os.environ.get("POSTHOG_HOST", "https://us.posthog.com")
 AG_PROD_PROJECT_ID = "78784"  # AG Prod
 SCITE_PROD_PROJECT_ID = "91941"  # Scite PROD (correct project ID)
 API_KEY = os.environ.get("POSTHOG_API_KEY", "phx_14mWUBH3yJjEAz5b8OZd2Qhi4FJre4LNfZzxYmgeMAgTiWzh")
@@ -36,6 +46,52 @@ headers = {
 CHECK_HOURS = 2160  # 90 days
 COMPARISON_PERIODS = 2  # Compare current vs previous 90 days
 
+# Step 2 analysis mode:
+#   grouped     - one GROUP BY companyid query covering every company (default)
+#   rollup      - incremental local store of per-company daily counts; only
+#                 missing days are pulled from PostHog. Windows are whole UTC
+#                 days ending at the last midnight, so today's events are not
+#                 counted (grouped/per_company windows end at now())
+#   per_company - legacy fan-out, five queries per company
+ANALYSIS_MODE = os.environ.get("ANALYSIS_MODE", "grouped")
+GROUPED_BATCH_SIZE = int(os.environ.get("GROUPED_BATCH_SIZE", "500"))  # companies per grouped query
+
+# Daily rollup store used by ANALYSIS_MODE=rollup
+ROLLUP_PATH = os.environ.get("ROLLUP_PATH", os.path.expanduser("~/.cache/account_monitor/rollup.sqlite"))
+ROLLUP_EXTRA_WINDOWS = [int(d) for d in os.environ.get("ROLLUP_EXTRA_WINDOWS", "7,30").split(',') if d.strip()]
+ROLLUP_PAGE_SIZE = int(os.environ.get("ROLLUP_PAGE_SIZE", "50000"))  # rows per day query page
+# Most recent stored days pulled again every run, since PostHog can ingest events late
+ROLLUP_REFRESH_DAYS = int(os.environ.get("ROLLUP_REFRESH_DAYS", "2"))
+
+# Checkpointing of Step 1/Step 2 results
+#   MONITOR_RESUME=1      - reload finished companies and only query the rest
+#   MONITOR_REPORT_ONLY=1 - skip all PostHog queries and report from saved results
+MONITOR_CHECKPOINT = os.environ.get("MONITOR_CHECKPOINT", "/tmp/ag3_churn_checkpoint.jsonl")
+MONITOR_REPORT_ONLY = os.environ.get("MONITOR_REPORT_ONLY", "0") == "1"
+MONITOR_RESUME = os.environ.get("MONITOR_RESUME", "0") == "1" or MONITOR_REPORT_ONLY
+
+# Query concurrency and rate limiting
+# POSTHOG_PROJECT_RATES overrides the default per project, e.g. "78784=1.0:5,91941=0.3:2"
+# (queries per second : burst size)
+HOGQL_WORKERS = int(os.environ.get("HOGQL_WORKERS", "4"))
+POSTHOG_QUERY_RATE = float(os.environ.get("POSTHOG_QUERY_RATE", "0.5"))
+POSTHOG_QUERY_BURST = int(os.environ.get("POSTHOG_QUERY_BURST", "3"))
+POSTHOG_PROJECT_RATES = os.environ.get("POSTHOG_PROJECT_RATES", "")
+
+# On-disk HogQL result cache (set HOGQL_CACHE=0 to disable)
+# Results are keyed by query text, project and time bucket, so reruns within the
+# same bucket (a day by default) never hit PostHog again
+HOGQL_CACHE = os.environ.get("HOGQL_CACHE", "1") != "0"
+HOGQL_CACHE_PATH = os.environ.get("HOGQL_CACHE_PATH", os.path.expanduser("~/.cache/account_monitor/hogql_cache.sqlite"))
+HOGQL_CACHE_BUCKET_HOURS = float(os.environ.get("HOGQL_CACHE_BUCKET_HOURS", "24"))
+HOGQL_CACHE_TTL_HOURS = float(os.environ.get("HOGQL_CACHE_TTL_HOURS", "48"))
+HOGQL_CACHE_MAX_MB = float(os.environ.get("HOGQL_CACHE_MAX_MB", "256"))
+
+# Run instrumentation: per-query and per-step timings written at the end of every run
+# (set either to "" to skip that file)
+MONITOR_METRICS_JSON = os.environ.get("MONITOR_METRICS_JSON", "/tmp/ag3_churn_metrics.json")
+MONITOR_METRICS_PROM = os.environ.get("MONITOR_METRICS_PROM", "/tmp/ag3_churn_metrics.prom")
+
 # Production default - monitor as many companies as possible
 # Override with COMPANY_LIMIT env variable for testing
 COMPANY_LIMIT = int(os.environ.get("COMPANY_LIMIT", "500"))
@@ -46,8 +102,6 @@ elif COMPANY_LIMIT <= 150:
     print(f"Running in STANDARD mode - monitoring {COMPANY_LIMIT} companies")
 else:
     print(f"Running in COMPREHENSIVE mode - monitoring {COMPANY_LIMIT} companies")
-print(f"Estimated runtime: ~{int(COMPANY_LIMIT * 0.2)} minutes")
-
 # Event categories
 EVENT_CATEGORIES = {
     'conversions': {
@@ -71,44 +125,668 @@ all_activity_events = []
 for cat in EVENT_CATEGORIES.values():
     all_activity_events.extend(cat['events'])
 
+# Step 2 is bound by the query rate limit: grouped analysis sends one query per company
+# batch, per-company analysis two window queries plus one per event category per company
+if ANALYSIS_MODE == "per_company":
+    step2_queries = COMPANY_LIMIT * (2 + len(EVENT_CATEGORIES))
+elif ANALYSIS_MODE == "grouped":
+    step2_queries = -(-COMPANY_LIMIT // GROUPED_BATCH_SIZE)
+else:
+    step2_queries = None
+if step2_queries is None:
+    print(f"Step 2 queries depend on how many days the rollup store is missing ({ANALYSIS_MODE} analysis)")
+else:
+    print(f"Estimated Step 2 runtime: ~{step2_queries / POSTHOG_QUERY_RATE / 60:.1f} minutes "
+          f"({step2_queries} HogQL queries at {POSTHOG_QUERY_RATE:g}/s, {ANALYSIS_MODE} analysis)")
+
+class TokenBucket:
+    """Thread-safe token bucket that slows down when PostHog returns 429"""
+
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def penalize(self, wait_time):
+        """Halve the rate and pause every caller for wait_time seconds"""
+        with self.lock:
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+            self.tokens = 0.0
+            self.blocked_until = max(self.blocked_until, time.monotonic() + wait_time)
+
+    def reward(self):
+        """Recover the rate gradually after successful requests"""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+class RateLimiter:
+    """Shared limiter that every HogQL request goes through, with per-project buckets"""
+
+    def __init__(self, rate, burst, overrides=""):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = {}
+        for entry in filter(None, (e.strip() for e in overrides.split(','))):
+            project, _, limits = entry.partition('=')
+            project_rate, _, project_burst = limits.partition(':')
+            self.overrides[project.strip()] = (float(project_rate), int(project_burst or burst))
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, project_id):
+        with self.lock:
+            if project_id not in self.buckets:
+                rate, burst = self.overrides.get(str(project_id), (self.rate, self.burst))
+                self.buckets[project_id] = TokenBucket(rate, burst)
+            return self.buckets[project_id]
+
+class HogQLCache:
+    """SQLite cache of HogQL responses with TTL and size-based (LRU) eviction"""
+
+    def __init__(self, path, bucket_hours, ttl_hours, max_mb):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.bucket_seconds = bucket_hours * 3600
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS hogql_cache (
+                key TEXT PRIMARY KEY,
+                project_id TEXT,
+                response TEXT,
+                size INTEGER,
+                created_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self.conn.execute("DELETE FROM hogql_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        self.conn.commit()
+
+    def key(self, query, project_id):
+        normalized = re.sub(r"\s+", " ", query).strip()
+        bucket = int(time.time() // self.bucket_seconds)
+        return hashlib.sha256(f"{project_id}\n{bucket}\n{normalized}".encode()).hexdigest()
+
+    def get(self, query, project_id):
+        key = self.key(query, project_id)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM hogql_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            if row[1] < time.time() - self.ttl_seconds:
+                self.conn.execute("DELETE FROM hogql_cache WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE hogql_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        return json.loads(row[0])
+
+    def set(self, query, project_id, response):
+        body = json.dumps(response)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO hogql_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (self.key(query, project_id), str(project_id), body, len(body), now, now)
+            )
+            # Evict least recently used entries once the cache outgrows its budget
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM hogql_cache").fetchone()[0]
+            while total > self.max_bytes:
+                oldest = self.conn.execute(
+                    "SELECT key, size FROM hogql_cache ORDER BY accessed_at LIMIT 1"
+                ).fetchone()
+                if not oldest:
+                    break
+                self.conn.execute("DELETE FROM hogql_cache WHERE key = ?", (oldest[0],))
+                total -= oldest[1]
+            self.conn.commit()
+
+class RunMetrics:
+    """Records every HogQL call and each Step's wall time; reported once at exit"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.started_at = datetime.now(timezone.utc)
+        self.queries = []
+        self.steps = []
+        self.current_step = None
+        self.lock = threading.Lock()
+        self.reported = False
+
+    def record_query(self, project_id, duration, status, retries=0, bytes_received=0,
+                     rate_limited=0, rate_limit_wait=0.0, backoff=0.0, cache_hit=False):
+        with self.lock:
+            self.queries.append({
+                'project_id': str(project_id),
+                'duration': duration,
+                'status': str(status),
+                'retries': retries,
+                'bytes': bytes_received,
+                'rate_limited': rate_limited,
+                'rate_limit_wait': rate_limit_wait,
+                'backoff': backoff,
+                'cache_hit': cache_hit,
+            })
+
+    def start_step(self, name):
+        """Close the running step (if any) and start timing the next one"""
+        now = time.monotonic()
+        if self.current_step:
+            self.steps.append((self.current_step[0], now - self.current_step[1]))
+        self.current_step = (name, now) if name else None
+
+    def query_summary(self):
+        """Per-project totals and latency percentiles"""
+        summary = {}
+        for project_id in sorted({q['project_id'] for q in self.queries}):
+            queries = [q for q in self.queries if q['project_id'] == project_id]
+            sent = sorted(q['duration'] for q in queries if not q['cache_hit'])
+            statuses = defaultdict(int)
+            for q in queries:
+                statuses[q['status']] += 1
+            summary[project_id] = {
+                'queries': len(queries),
+                'cache_hits': sum(q['cache_hit'] for q in queries),
+                'retries': sum(q['retries'] for q in queries),
+                'bytes': sum(q['bytes'] for q in queries),
+                'rate_limited': sum(q['rate_limited'] for q in queries),
+                'seconds': sum(sent),
+                'rate_limit_wait_seconds': sum(q['rate_limit_wait'] for q in queries),
+                'backoff_seconds': sum(q['backoff'] for q in queries),
+                'p50_seconds': sent[len(sent) // 2] if sent else 0.0,
+                'p95_seconds': sent[min(len(sent) - 1, int(len(sent) * 0.95))] if sent else 0.0,
+                'max_seconds': sent[-1] if sent else 0.0,
+                'statuses': dict(statuses),
+            }
+        return summary
+
+    def print_summary(self, projects, total):
+        print(f"\nRun timing ({total:.1f}s total)")
+        print("-"*100)
+        for name, seconds in self.steps:
+            print(f"  {name:<40} {seconds:>9.1f}s {seconds / total * 100 if total else 0:>6.1f}%")
+        if projects:
+            print(f"\n  {'Project':<10} {'Queries':>8} {'Cached':>7} {'Retries':>8} {'429s':>6} {'MB':>8} "
+                  f"{'Query s':>9} {'Limiter s':>10} {'Backoff s':>10} {'p50':>7} {'p95':>7}  Statuses")
+            for project_id, p in projects.items():
+                statuses = ', '.join(f"{k}: {v}" for k, v in sorted(p['statuses'].items()))
+                print(f"  {project_id:<10} {p['queries']:>8} {p['cache_hits']:>7} {p['retries']:>8} {p['rate_limited']:>6} "
+                      f"{p['bytes'] / 1e6:>8.2f} {p['seconds']:>9.1f} {p['rate_limit_wait_seconds']:>10.1f} "
+                      f"{p['backoff_seconds']:>10.1f} {p['p50_seconds']:>7.2f} {p['p95_seconds']:>7.2f}  {statuses}")
+
+    def write_json(self, path, projects, total):
+        with open(path, 'w') as f:
+            json.dump({
+                'started_at': self.started_at.isoformat(),
+                'total_seconds': total,
+                'analysis_mode': ANALYSIS_MODE,
+                'company_limit': COMPANY_LIMIT,
+                'steps': [{'step': name, 'seconds': seconds} for name, seconds in self.steps],
+                'projects': projects,
+                'queries': self.queries,
+            }, f, indent=2)
+
+    def write_prometheus(self, path, projects, total):
+        """Textfile-collector format, written atomically so a scrape never sees half a file"""
+        prefix = "account_monitor"
+        lines = [
+            f"# TYPE {prefix}_run_seconds gauge",
+            f"{prefix}_run_seconds {total:.3f}",
+            f"# TYPE {prefix}_last_run_timestamp_seconds gauge",
+            f"{prefix}_last_run_timestamp_seconds {self.started_at.timestamp():.0f}",
+            f"# TYPE {prefix}_step_seconds gauge",
+        ]
+        lines += [f'{prefix}_step_seconds{{step="{name}"}} {seconds:.3f}' for name, seconds in self.steps]
+        gauges = [
+            ('hogql_queries', 'queries'), ('hogql_cache_hits', 'cache_hits'),
+            ('hogql_retries', 'retries'), ('hogql_rate_limited', 'rate_limited'),
+            ('hogql_response_bytes', 'bytes'),
+            ('hogql_query_seconds', 'seconds'),
+            ('hogql_rate_limit_wait_seconds', 'rate_limit_wait_seconds'),
+            ('hogql_backoff_seconds', 'backoff_seconds'),
+            ('hogql_query_p95_seconds', 'p95_seconds'),
+        ]
+        for metric, key in gauges:
+            lines.append(f"# TYPE {prefix}_{metric} gauge")
+            lines += [f'{prefix}_{metric}{{project="{project_id}"}} {round(p[key], 3)}' for project_id, p in projects.items()]
+        lines.append(f"# TYPE {prefix}_hogql_status gauge")
+        for project_id, p in projects.items():
+            lines += [f'{prefix}_hogql_status{{project="{project_id}",status="{status}"}} {n}'
+                      for status, n in p['statuses'].items()]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+    def report(self):
+        """Print the summary and write the metrics files (runs at exit, even after a failure)"""
+        if self.reported:
+            return
+        self.reported = True
+        self.start_step(None)
+        total = time.monotonic() - self.started
+        with self.lock:
+            projects = self.query_summary()
+        self.print_summary(projects, total)
+        for path, write in ((MONITOR_METRICS_JSON, self.write_json), (MONITOR_METRICS_PROM, self.write_prometheus)):
+            if not path:
+                continue
+            try:
+                write(path, projects, total)
+                print(f"✓ Run metrics written to {path}")
+            except OSError as e:
+                print(f"⚠️  Could not write run metrics to {path}: {e}")
+
+hogql_cache = (
+    HogQLCache(HOGQL_CACHE_PATH, HOGQL_CACHE_BUCKET_HOURS, HOGQL_CACHE_TTL_HOURS, HOGQL_CACHE_MAX_MB)
+    if HOGQL_CACHE else None
+)
+
+rate_limiter = RateLimiter(POSTHOG_QUERY_RATE, POSTHOG_QUERY_BURST, POSTHOG_PROJECT_RATES)
+hogql_pool = ThreadPoolExecutor(max_workers=HOGQL_WORKERS)
+run_metrics = RunMetrics()
+atexit.register(run_metrics.report)
+# One kept-alive TLS connection per query worker
+posthog_session = create_session(pool_size=HOGQL_WORKERS)
+
+def retry_after_seconds(response):
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
 def run_hogql_query(query, project_id=None):
-    """Execute HogQL query with conservative rate limiting for weekly runs"""
+    """Execute HogQL query through the on-disk cache and shared per-project rate limiter"""
     if project_id is None:
         project_id = AG_PROD_PROJECT_ID
 
+    if hogql_cache:
+        cached = hogql_cache.get(query, project_id)
+        if cached is not None:
+            run_metrics.record_query(project_id, 0.0, 'cache', cache_hit=True)
+            return cached
+
     url = f"{POSTHOG_HOST}/api/projects/{project_id}/query/"
     payload = {"query": {"kind": "HogQLQuery", "query": query}}
-
-    max_retries = 8  # More retries for comprehensive weekly runs
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=180)
-            response.raise_for_status()
-            time.sleep(3.0)  # Conservative 3 second rate limiting
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 429:
-                # Exponential backoff starting at 20 seconds
-                wait_time = 20 * (2 ** attempt)
-                print(f"  Rate limit, waiting {wait_time}s...")
-                time.sleep(wait_time)
-                continue
-            elif e.response.status_code == 504:
-                print(f"  Timeout, retrying in 60s...")
+    bucket = rate_limiter.bucket(project_id)
+
+    started = time.monotonic()
+    status = 'max_retries'
+    attempt = 0
+    bytes_received = 0
+    rate_limited = 0
+    rate_limit_wait = 0.0
+    backoff = 0.0
+    try:
+        max_retries = 8  # More retries for comprehensive weekly runs
+        for attempt in range(max_retries):
+            waited = time.monotonic()
+            bucket.acquire()
+            rate_limit_wait += time.monotonic() - waited
+            try:
+                response = posthog_session.post(url, headers=headers, json=payload, timeout=180)
+                bytes_received += len(response.content)
+                response.raise_for_status()
+                bucket.reward()
+                data = response.json()
+                status = response.status_code
+                if hogql_cache:
+                    hogql_cache.set(query, project_id, data)
+                return data
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code
+                if e.response.status_code == 429:
+                    # Honour Retry-After, falling back to exponential backoff from 20 seconds
+                    wait_time = retry_after_seconds(e.response)
+                    if wait_time is None:
+                        wait_time = 20 * (2 ** attempt)
+                    print(f"  Rate limit, waiting {wait_time:.0f}s...")
+                    rate_limited += 1
+                    bucket.penalize(wait_time)
+                    continue
+                elif e.response.status_code == 504:
+                    print(f"  Timeout, retrying in 60s...")
+                    time.sleep(60)
+                    backoff += 60
+                    continue
+                print(f"Query error: {e}")
+                return None
+            except requests.exceptions.Timeout:
+                status = 'timeout'
+                print(f"  Query timeout, retrying in 60s...")
                 time.sleep(60)
+                backoff += 60
                 continue
-            print(f"Query error: {e}")
-            return None
-        except requests.exceptions.Timeout:
-            print(f"  Query timeout, retrying in 60s...")
-            time.sleep(60)
+            except Exception as e:
+                status = 'error'
+                print(f"Query error: {e}")
+                return None
+
+        status = 'max_retries'
+        print("  Max retries exceeded")
+        return None
+    finally:
+        run_metrics.record_query(project_id, time.monotonic() - started, status, attempt,
+                                 bytes_received, rate_limited, rate_limit_wait, backoff)
+
+def run_hogql_queries(jobs):
+    """Run (query, project_id) jobs concurrently, returning results in job order"""
+    return list(hogql_pool.map(lambda job: run_hogql_query(*job), jobs))
+
+def hogql_event_list(events):
+    """Format event names as a HogQL IN (...) list"""
+    return ','.join([f"'{e}'" for e in events])
+
+def build_grouped_activity_query(companyids):
+    """Build one HogQL query computing Step 2 metrics for every company at once"""
+    current = f"timestamp >= now() - INTERVAL {CHECK_HOURS} HOUR"
+    category_columns = "".join(
+        f"countIf({current} AND event IN ({hogql_event_list(cat['events'])})) as {cat_key},\n            "
+        for cat_key, cat in EVENT_CATEGORIES.items()
+    )
+    return f"""
+        SELECT
+            toString(person.properties.companyid) as companyid,
+            countIf({current}) as total_events,
+            countIf(timestamp < now() - INTERVAL {CHECK_HOURS} HOUR) as previous_events,
+            {category_columns}uniqExactIf(event, {current}) as event_types,
+            uniqExactIf(person.properties.email, {current}) as active_users
+        FROM events
+        WHERE timestamp >= now() - INTERVAL {CHECK_HOURS * 2} HOUR
+        AND toString(person.properties.companyid) IN ({','.join([f"'{c}'" for c in companyids])})
+        AND event IN ({hogql_event_list(all_activity_events)})
+        GROUP BY companyid
+        LIMIT {len(companyids)}
+    """
+
+def run_grouped_activity_query(companyids):
+    """Return ({companyid: metrics}, failed companyids) using concurrent grouped queries"""
+    batches = [companyids[i:i + GROUPED_BATCH_SIZE] for i in range(0, len(companyids), GROUPED_BATCH_SIZE)]
+    results = run_hogql_queries(
+        [(build_grouped_activity_query(batch), AG_PROD_PROJECT_ID) for batch in batches]
+    )
+
+    default_columns = (
+        ['companyid', 'total_events', 'previous_events']
+        + list(EVENT_CATEGORIES.keys())
+        + ['event_types', 'active_users']
+    )
+    metrics_by_company = {}
+    failed = set()
+    for batch, result in zip(batches, results):
+        if not result or "results" not in result:
+            failed.update(batch)
             continue
-        except Exception as e:
-            print(f"Query error: {e}")
-            return None
+        columns = result.get("columns") or default_columns
+        for row in result["results"]:
+            metrics = dict(zip(columns, row))
+            metrics_by_company[str(metrics.pop('companyid'))] = {k: v or 0 for k, v in metrics.items()}
+    return metrics_by_company, failed
+
+def apply_activity_metrics(company, ag_current, ag_previous, event_types, active_users,
+                           category_breakdown, scite_activity):
+    """Fill the company[...] fields and status from raw activity counts"""
+    if scite_activity:
+        scite_events = scite_activity['events']
+        scite_users = scite_activity['users']
+    else:
+        scite_events = 0
+        scite_users = 0
 
-    print("  Max retries exceeded")
-    return None
+    # Calculate metrics
+    company['ag_current_events'] = ag_current
+    company['ag_previous_events'] = ag_previous
+    company['active_users'] = active_users
+    company['engagement_rate'] = (active_users / company['user_count'] * 100) if company['user_count'] > 0 else 0
+    company['event_types'] = event_types
+    company['conversions'] = category_breakdown['conversions']
+    company['searches'] = category_breakdown['searches']
+    company['article_views'] = category_breakdown['article_views']
+    company['scite_prod_events'] = scite_events
+    company['scite_prod_users'] = scite_users
+
+    # Calculate change
+    if ag_previous > 0:
+        change_pct = ((ag_current - ag_previous) / ag_previous) * 100
+        company['change_pct'] = change_pct
+    else:
+        company['change_pct'] = None
+
+    # Determine status
+    if ag_current == 0 and ag_previous > 0:
+        company['status'] = 'churned'
+    elif ag_current == 0:
+        company['status'] = 'inactive'
+    elif ag_previous > 0 and change_pct < -50:
+        company['status'] = 'declining'
+    elif ag_previous > 0 and change_pct < -25:
+        company['status'] = 'at_risk'
+    else:
+        company['status'] = 'healthy'
+
+def activity_from_metrics(company, metrics):
+    """Apply a row of grouped/rollup metrics to a company (missing row means no activity)"""
+    apply_activity_metrics(
+        company,
+        metrics.get('total_events', 0),
+        metrics.get('previous_events', 0),
+        metrics.get('event_types', 0),
+        metrics.get('active_users', 0),
+        {cat_key: metrics.get(cat_key, 0) for cat_key in EVENT_CATEGORIES},
+        scite_domain_activity.get(company['domain'])
+    )
+
+class RollupStore:
+    """Local SQLite store of per-company, per-day, per-event counts and active users"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS daily_events (
+                companyid TEXT, day TEXT, event TEXT, events INTEGER,
+                PRIMARY KEY (companyid, day, event)
+            );
+            CREATE TABLE IF NOT EXISTS daily_users (
+                companyid TEXT, day TEXT, email TEXT,
+                PRIMARY KEY (companyid, day, email)
+            );
+            CREATE TABLE IF NOT EXISTS synced_days (day TEXT PRIMARY KEY);
+        """)
+
+    def synced_days(self):
+        return {row[0] for row in self.conn.execute("SELECT day FROM synced_days")}
+
+    def replace_day(self, day, event_rows, user_rows):
+        """Replace everything stored for one finished day and mark it synced"""
+        with self.conn:
+            self.conn.execute("DELETE FROM daily_events WHERE day = ?", (day,))
+            self.conn.execute("DELETE FROM daily_users WHERE day = ?", (day,))
+            self.conn.executemany("INSERT INTO daily_events VALUES (?, ?, ?, ?)",
+                                  [(str(r[0]), day, str(r[1]), r[2]) for r in event_rows])
+            self.conn.executemany("INSERT OR IGNORE INTO daily_users VALUES (?, ?, ?)",
+                                  [(str(r[0]), day, r[1]) for r in user_rows if r[1]])
+            self.conn.execute("INSERT OR IGNORE INTO synced_days VALUES (?)", (day,))
+
+    def prune(self, oldest_day):
+        with self.conn:
+            for table in ('daily_events', 'daily_users', 'synced_days'):
+                self.conn.execute(f"DELETE FROM {table} WHERE day < ?", (oldest_day,))
+
+    def load(self, since_day):
+        events = pd.read_sql_query("SELECT * FROM daily_events WHERE day >= ?", self.conn, params=(since_day,))
+        users = pd.read_sql_query("SELECT * FROM daily_users WHERE day >= ?", self.conn, params=(since_day,))
+        return events, users
+
+def build_rollup_day_query(day, kind, offset=0):
+    """HogQL query for one page of a UTC day's per-company event counts or active users"""
+    day_filter = f"""
+        timestamp >= toDateTime('{day} 00:00:00')
+        AND timestamp < toDateTime('{day} 00:00:00') + INTERVAL 1 DAY
+        AND person.properties.companyid IS NOT NULL
+        AND event IN ({hogql_event_list(all_activity_events)})
+    """
+    if kind == 'events':
+        return f"""
+        SELECT toString(person.properties.companyid) as companyid, event, count(*) as events
+        FROM events
+        WHERE {day_filter}
+        GROUP BY companyid, event
+        ORDER BY companyid, event
+        LIMIT {ROLLUP_PAGE_SIZE} OFFSET {offset}
+    """
+    return f"""
+        SELECT toString(person.properties.companyid) as companyid, person.properties.email as email
+        FROM events
+        WHERE {day_filter}
+        AND person.properties.email IS NOT NULL
+        GROUP BY companyid, email
+        ORDER BY companyid, email
+        LIMIT {ROLLUP_PAGE_SIZE} OFFSET {offset}
+    """
+
+def sync_rollup(store, window_days):
+    """Pull every missing day of the comparison windows, and the most recent ones again"""
+    # Both windows are whole days ending at the last UTC midnight; today is still
+    # accumulating events, so it is never stored
+    today = datetime.now(timezone.utc).date()
+    oldest = today - timedelta(days=window_days * 2)
+    refresh_from = (today - timedelta(days=ROLLUP_REFRESH_DAYS)).isoformat()
+    synced = store.synced_days()
+    days = [(oldest + timedelta(days=n)).isoformat() for n in range(window_days * 2)]
+    missing = [day for day in days if day not in synced or day >= refresh_from]
+    print(f"  Rollup store has {len(synced)} days, pulling {len(missing)} from PostHog "
+          f"(the last {ROLLUP_REFRESH_DAYS} are always refreshed)...")
+
+    # A page that comes back full may have been cut off by the LIMIT, so that day is
+    # paged further; a day is only stored once every page of it is in
+    rows = {(day, kind): [] for day in missing for kind in ('events', 'users')}
+    pending = list(rows)
+    failed = set()
+    paged = set()
+    while pending:
+        results = run_hogql_queries([
+            (build_rollup_day_query(day, kind, len(rows[(day, kind)])), AG_PROD_PROJECT_ID)
+            for day, kind in pending
+        ])
+        next_pending = []
+        for (day, kind), result in zip(pending, results):
+            if not result or "results" not in result:
+                failed.add(day)
+                continue
+            rows[(day, kind)].extend(result["results"])
+            if len(result["results"]) >= ROLLUP_PAGE_SIZE:
+                next_pending.append((day, kind))
+        pending = [key for key in next_pending if key[0] not in failed]
+        paged.update(day for day, kind in pending)
+    if paged:
+        print(f"  Paged {len(paged)} busy days beyond {ROLLUP_PAGE_SIZE} rows per query")
+
+    for day in missing:
+        if day not in failed:
+            store.replace_day(day, rows[(day, 'events')], rows[(day, 'users')])
+
+    store.prune(oldest.isoformat())
+    return oldest, sorted(failed)
+
+def rollup_window_metrics(store, oldest, window_days, extra_windows=()):
+    """Compute grouped-style Step 2 metrics per company from the local rollup"""
+    events, users = store.load(oldest.isoformat())
+    if events.empty:
+        return {}
+
+    # Age 1 is yesterday, the newest whole day in the store
+    today = pd.Timestamp(datetime.now(timezone.utc).date())
+    events['age'] = (today - pd.to_datetime(events['day'])).dt.days.to_numpy()
+    users['age'] = (today - pd.to_datetime(users['day'])).dt.days.to_numpy()
+    current = (events['age'] >= 1) & (events['age'] <= window_days)
+    previous = (events['age'] > window_days) & (events['age'] <= window_days * 2)
+
+    event_category = {e: cat_key for cat_key, cat in EVENT_CATEGORIES.items() for e in cat['events']}
+    events['category'] = events['event'].map(event_category)
+
+    metrics = pd.DataFrame({
+        'total_events': events[current].groupby('companyid')['events'].sum(),
+        'previous_events': events[previous].groupby('companyid')['events'].sum(),
+        'event_types': events[current & (events['events'] > 0)].groupby('companyid')['event'].nunique(),
+        'active_users': users[(users['age'] >= 1) & (users['age'] <= window_days)]
+            .groupby('companyid')['email'].nunique(),
+    })
+    categories = events[current].pivot_table(index='companyid', columns='category', values='events',
+                                             aggfunc='sum')
+    metrics = metrics.join(categories.reindex(columns=list(EVENT_CATEGORIES)))
+    for days in extra_windows:
+        in_window = (events['age'] >= 1) & (events['age'] <= days)
+        metrics[f'ag_{days}d_events'] = events[in_window].groupby('companyid')['events'].sum()
+
+    metrics = metrics.fillna(0).astype(int)
+    return metrics.to_dict(orient='index')
+
+def checkpoint_default(value):
+    """JSON encoder for pandas/numpy values found in company records"""
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def checkpoint_object_hook(obj):
+    if '__datetime__' in obj:
+        return pd.Timestamp(obj['__datetime__'])
+    return obj
+
+class CompanyCheckpoint:
+    """JSONL checkpoint holding the Step 1 company list and each finished Step 2 result"""
+
+    def __init__(self, path, resume):
+        self.path = path
+        self.companies = None
+        self.results = {}
+        if resume and os.path.exists(path):
+            for entry in load_jsonl(path, object_hook=checkpoint_object_hook):
+                if entry['type'] == 'companies':
+                    self.companies = entry['companies']
+                else:
+                    self.results[str(entry['company']['companyid'])] = entry['company']
+            print(f"✓ Loaded checkpoint: {len(self.results)} finished companies")
+        else:
+            open(path, 'w').close()
+
+    def save_companies(self, companies):
+        self.companies = companies
+        append_jsonl(self.path, {'type': 'companies', 'companies': companies}, checkpoint_default)
+
+    def save_result(self, company):
+        self.results[str(company['companyid'])] = company
+        append_jsonl(self.path, {'type': 'result', 'company': company}, checkpoint_default)
 
 def extract_domain(email):
     if email and '@' in email:
@@ -137,6 +815,7 @@ print("ENHANCED ACCOUNT ACTIVITY MONITOR WITH ARR INTEGRATION")
 print("="*100)
 
 # Load HubSpot ARR data
+run_metrics.start_step("HubSpot ARR load")
 print(f"\nLoading HubSpot ARR data...")
 print("-"*100)
 
@@ -169,60 +848,7 @@ except Exception as e:
 
 print("="*100)
 
-# Step 0.5: Load Scite PROD activity by domain
-print(f"\nLoading Scite PROD activity by domain...")
-print("-"*100)
-
-try:
-    # Query Scite PROD for all email activity in the last 90 days
-    query_scite_emails = f"""
-        SELECT
-            person.properties.email as email,
-            count(*) as event_count
-        FROM events
-        WHERE timestamp >= now() - INTERVAL {CHECK_HOURS} HOUR
-        AND person.properties.email IS NOT NULL
-        AND person.properties.email LIKE '%@%'
-        GROUP BY email
-        ORDER BY event_count DESC
-        LIMIT 20000
-    """
-
-    result = run_hogql_query(query_scite_emails, SCITE_PROD_PROJECT_ID)
-
-    # Build domain-to-activity mapping
-    scite_domain_activity = defaultdict(lambda: {'users': 0, 'events': 0})
-
-    if result and result.get("results"):
-        for row in result["results"]:
-            email = row[0]
-            events = row[1]
-
-            if email and '@' in email:
-                domain = email.split('@')[1].lower()
-                # Only track domains in our HubSpot list
-                if domain in arr_map:
-                    scite_domain_activity[domain]['users'] += 1
-                    scite_domain_activity[domain]['events'] += events
-
-        total_scite_companies = len(scite_domain_activity)
-        total_scite_events = sum(d['events'] for d in scite_domain_activity.values())
-        print(f"✓ Loaded Scite PROD data for {total_scite_companies} companies")
-        print(f"  Total Scite events: {total_scite_events:,}")
-    else:
-        print(f"⚠️  Could not load Scite PROD data (query failed or timed out)")
-        scite_domain_activity = {}
-
-except Exception as e:
-    print(f"⚠️  Error loading Scite PROD data: {e}")
-    scite_domain_activity = {}
-
-print("="*100)
-
-# Step 1: Get companies
-print(f"\nStep 1: Getting top {COMPANY_LIMIT} companies...")
-print("-"*100)
-
+# Step 1's company query runs on AG PROD while Step 0.5 queries Scite PROD
 query_companies = f"""
     SELECT
         JSONExtractString(properties, '$set', 'companyid') as companyid,
@@ -238,50 +864,125 @@ query_companies = f"""
     LIMIT {COMPANY_LIMIT}
 """
 
-result = run_hogql_query(query_companies, AG_PROD_PROJECT_ID)
-
-if not result or not result.get("results"):
-    print("Failed to get company data")
+checkpoint = CompanyCheckpoint(MONITOR_CHECKPOINT, MONITOR_RESUME)
+if MONITOR_REPORT_ONLY and checkpoint.companies is None:
+    print(f"No saved results found in {MONITOR_CHECKPOINT}")
     exit(1)
 
-companies_data = []
-for row in result["results"]:
-    companyid = row[0]
-    user_count = row[1]
-    sample_email = row[2]
+if checkpoint.companies is None:
+    companies_future = hogql_pool.submit(run_hogql_query, query_companies, AG_PROD_PROJECT_ID)
+
+# Step 0.5: Load Scite PROD activity by domain
+run_metrics.start_step("Step 0.5: Scite PROD activity")
+print(f"\nLoading Scite PROD activity by domain...")
+print("-"*100)
+
+if MONITOR_REPORT_ONLY:
+    print("Skipped (report-only mode uses saved results)")
+    scite_domain_activity = {}
+else:
+    try:
+        # Query Scite PROD for all email activity in the last 90 days
+        query_scite_emails = f"""
+            SELECT
+                person.properties.email as email,
+                count(*) as event_count
+            FROM events
+            WHERE timestamp >= now() - INTERVAL {CHECK_HOURS} HOUR
+            AND person.properties.email IS NOT NULL
+            AND person.properties.email LIKE '%@%'
+            GROUP BY email
+            ORDER BY event_count DESC
+            LIMIT 20000
+        """
+
+        result = run_hogql_query(query_scite_emails, SCITE_PROD_PROJECT_ID)
+
+        # Build domain-to-activity mapping
+        scite_domain_activity = defaultdict(lambda: {'users': 0, 'events': 0})
+
+        if result and result.get("results"):
+            for row in result["results"]:
+                email = row[0]
+                events = row[1]
+
+                if email and '@' in email:
+                    domain = email.split('@')[1].lower()
+                    # Only track domains in our HubSpot list
+                    if domain in arr_map:
+                        scite_domain_activity[domain]['users'] += 1
+                        scite_domain_activity[domain]['events'] += events
+
+            total_scite_companies = len(scite_domain_activity)
+            total_scite_events = sum(d['events'] for d in scite_domain_activity.values())
+            print(f"✓ Loaded Scite PROD data for {total_scite_companies} companies")
+            print(f"  Total Scite events: {total_scite_events:,}")
+        else:
+            print(f"⚠️  Could not load Scite PROD data (query failed or timed out)")
+            scite_domain_activity = {}
+
+    except Exception as e:
+        print(f"⚠️  Error loading Scite PROD data: {e}")
+        scite_domain_activity = {}
+
+print("="*100)
+
+# Step 1: Get companies
+run_metrics.start_step("Step 1: Companies")
+print(f"\nStep 1: Getting top {COMPANY_LIMIT} companies...")
+print("-"*100)
+
+if checkpoint.companies is not None:
+    companies_data = checkpoint.companies
+    print(f"✓ Loaded {len(companies_data)} companies from checkpoint")
+else:
+    result = companies_future.result()
+
+    if not result or not result.get("results"):
+        print("Failed to get company data")
+        exit(1)
+
+    companies_data = []
+    for row in result["results"]:
+        companyid = row[0]
+        user_count = row[1]
+        sample_email = row[2]
     
-    domain = extract_domain(sample_email) if sample_email else None
-
-    # Check if we have ARR data for this domain
-    arr_info = arr_map.get(domain, {}) if domain else {}
-    arr = arr_info.get('arr', 0)
-    hubspot_name = arr_info.get('company_name')
-    renewal_date = arr_info.get('renewal_date')
-    industry = arr_info.get('industry')
-
-    # Use HubSpot name if available, otherwise derive from domain
-    company_name = hubspot_name if hubspot_name else (domain_to_company_name(domain) if domain else f"Company {companyid}")
-
-    companies_data.append({
-        'companyid': companyid,
-        'user_count': user_count,
-        'domain': domain,
-        'company_name': company_name,
-        'arr': arr,
-        'renewal_date': renewal_date,
-        'industry': industry
-    })
+        domain = extract_domain(sample_email) if sample_email else None
+
+        # Check if we have ARR data for this domain
+        arr_info = arr_map.get(domain, {}) if domain else {}
+        arr = arr_info.get('arr', 0)
+        hubspot_name = arr_info.get('company_name')
+        renewal_date = arr_info.get('renewal_date')
+        industry = arr_info.get('industry')
+
+        # Use HubSpot name if available, otherwise derive from domain
+        company_name = hubspot_name if hubspot_name else (domain_to_company_name(domain) if domain else f"Company {companyid}")
+
+        companies_data.append({
+            'companyid': companyid,
+            'user_count': user_count,
+            'domain': domain,
+            'company_name': company_name,
+            'arr': arr,
+            'renewal_date': renewal_date,
+            'industry': industry
+        })
+
+    checkpoint.save_companies(companies_data)
 
 print(f"Found {len(companies_data)} companies")
 
 # Step 2: Analyze each company
+run_metrics.start_step("Step 2: Activity trends")
 print(f"\nStep 2: Analyzing activity trends (90-day comparison)...")
 print("-"*100)
 
-for idx, company in enumerate(companies_data, 1):
+def analyze_company(company):
+    """Legacy per-company analysis: five HogQL queries for one company"""
     companyid = company['companyid']
-    print(f"  [{idx}/{len(companies_data)}] Processing {company['company_name']}...")
-    
+
     # Get AG PROD total activity (current)
     query_ag_current = f"""
         SELECT
@@ -291,9 +992,9 @@ for idx, company in enumerate(companies_data, 1):
         FROM events
         WHERE timestamp >= now() - INTERVAL {CHECK_HOURS} HOUR
         AND person.properties.companyid = {companyid}
-        AND event IN ({','.join([f"'{e}'" for e in all_activity_events])})
+        AND event IN ({hogql_event_list(all_activity_events)})
     """
-    
+
     result_ag_curr = run_hogql_query(query_ag_current, AG_PROD_PROJECT_ID)
     if result_ag_curr and result_ag_curr.get("results"):
         ag_current = result_ag_curr["results"][0][0] or 0
@@ -301,19 +1002,19 @@ for idx, company in enumerate(companies_data, 1):
         active_users = result_ag_curr["results"][0][2] or 0
     else:
         ag_current = event_types = active_users = 0
-    
+
     # Get AG PROD total activity (previous)
     query_ag_prev = f"""
         SELECT count(*) FROM events
         WHERE timestamp >= now() - INTERVAL {CHECK_HOURS * 2} HOUR
         AND timestamp < now() - INTERVAL {CHECK_HOURS} HOUR
         AND person.properties.companyid = {companyid}
-        AND event IN ({','.join([f"'{e}'" for e in all_activity_events])})
+        AND event IN ({hogql_event_list(all_activity_events)})
     """
-    
+
     result_ag_prev = run_hogql_query(query_ag_prev, AG_PROD_PROJECT_ID)
     ag_previous = result_ag_prev["results"][0][0] if result_ag_prev and result_ag_prev.get("results") else 0
-    
+
     # Get category breakdown
     category_breakdown = {}
     for cat_key, cat_info in EVENT_CATEGORIES.items():
@@ -321,51 +1022,66 @@ for idx, company in enumerate(companies_data, 1):
             SELECT count(*) FROM events
             WHERE timestamp >= now() - INTERVAL {CHECK_HOURS} HOUR
             AND person.properties.companyid = {companyid}
-            AND event IN ({','.join([f"'{e}'" for e in cat_info['events']])})
+            AND event IN ({hogql_event_list(cat_info['events'])})
         """
         result_cat = run_hogql_query(query_cat, AG_PROD_PROJECT_ID)
         count = result_cat["results"][0][0] if result_cat and result_cat.get("results") else 0
         category_breakdown[cat_key] = count
-    
-    # Get Scite PROD activity from pre-loaded mapping
-    domain = company['domain']
-    if domain and domain in scite_domain_activity:
-        scite_events = scite_domain_activity[domain]['events']
-        scite_users = scite_domain_activity[domain]['users']
-    else:
-        scite_events = 0
-        scite_users = 0
-    
-    # Calculate metrics
-    company['ag_current_events'] = ag_current
-    company['ag_previous_events'] = ag_previous
-    company['active_users'] = active_users
-    company['engagement_rate'] = (active_users / company['user_count'] * 100) if company['user_count'] > 0 else 0
-    company['event_types'] = event_types
-    company['conversions'] = category_breakdown['conversions']
-    company['searches'] = category_breakdown['searches']
-    company['article_views'] = category_breakdown['article_views']
-    company['scite_prod_events'] = scite_events
-    company['scite_prod_users'] = scite_users
-    
-    # Calculate change
-    if ag_previous > 0:
-        change_pct = ((ag_current - ag_previous) / ag_previous) * 100
-        company['change_pct'] = change_pct
-    else:
-        company['change_pct'] = None
-    
-    # Determine status
-    if ag_current == 0 and ag_previous > 0:
-        company['status'] = 'churned'
-    elif ag_current == 0:
-        company['status'] = 'inactive'
-    elif ag_previous > 0 and change_pct < -50:
-        company['status'] = 'declining'
-    elif ag_previous > 0 and change_pct < -25:
-        company['status'] = 'at_risk'
+
+    apply_activity_metrics(company, ag_current, ag_previous, event_types, active_users,
+                           category_breakdown, scite_domain_activity.get(company['domain']))
+
+def analyze_companies_concurrently(companies):
+    """Run the per-company analysis across the HogQL worker pool"""
+    futures = {hogql_pool.submit(analyze_company, company): company for company in companies}
+    for idx, future in enumerate(as_completed(futures), 1):
+        future.result()
+        checkpoint.save_result(futures[future])
+        print(f"  [{idx}/{len(companies)}] Processed {futures[future]['company_name']}")
+
+# Reuse results saved by an earlier, interrupted run
+for company in companies_data:
+    if str(company['companyid']) in checkpoint.results:
+        company.update(checkpoint.results[str(company['companyid'])])
+pending = [c for c in companies_data if str(c['companyid']) not in checkpoint.results]
+if MONITOR_RESUME:
+    print(f"  {len(companies_data) - len(pending)} companies restored from checkpoint, {len(pending)} remaining")
+if MONITOR_REPORT_ONLY:
+    companies_data = [c for c in companies_data if str(c['companyid']) in checkpoint.results]
+    pending = []
+    ANALYSIS_MODE = "report_only"
+
+if ANALYSIS_MODE == "rollup" and pending:
+    rollup_store = RollupStore(ROLLUP_PATH)
+    window_days = CHECK_HOURS // 24
+    rollup_oldest, failed_days = sync_rollup(rollup_store, window_days)
+    if failed_days:
+        print(f"  ⚠️  Could not pull {len(failed_days)} days into the rollup store, falling back to grouped analysis")
+        ANALYSIS_MODE = "grouped"
     else:
-        company['status'] = 'healthy'
+        activity_by_company = rollup_window_metrics(rollup_store, rollup_oldest, window_days, ROLLUP_EXTRA_WINDOWS)
+        for company in pending:
+            metrics = activity_by_company.get(str(company['companyid']), {})
+            activity_from_metrics(company, metrics)
+            for days in ROLLUP_EXTRA_WINDOWS:
+                company[f'ag_{days}d_events'] = metrics.get(f'ag_{days}d_events', 0)
+            checkpoint.save_result(company)
+
+if ANALYSIS_MODE == "grouped" and pending:
+    print(f"  Running grouped queries for {len(pending)} companies...")
+    activity_by_company, failed_ids = run_grouped_activity_query([c['companyid'] for c in pending])
+
+    for company in pending:
+        if company['companyid'] not in failed_ids:
+            # Companies with no matching events in either window get no row back
+            activity_from_metrics(company, activity_by_company.get(str(company['companyid']), {}))
+            checkpoint.save_result(company)
+
+    if failed_ids:
+        print(f"  ⚠️  Grouped query failed for {len(failed_ids)} companies, falling back to per-company analysis")
+        analyze_companies_concurrently([c for c in pending if c['companyid'] in failed_ids])
+elif ANALYSIS_MODE == "per_company":
+    analyze_companies_concurrently(pending)
 
 print(f"\n✓ Analysis complete for {len(companies_data)} companies")
 
@@ -380,6 +1096,7 @@ print(f"  At Risk: {len(at_risk)} companies (${sum(c['arr'] for c in at_risk):,.
 print(f"  Healthy: {len(healthy)} companies (${sum(c['arr'] for c in healthy):,.0f} ARR)")
 
 # Step 3: Generate Excel Export
+run_metrics.start_step("Step 3: Excel export")
 print(f"\nStep 3: Generating Excel export...")
 print("-"*100)
 
@@ -410,6 +1127,9 @@ for c in companies_data:
         'Status': c['status'].replace('_', ' ').title(),
         'Unique Event Types': c['event_types']
     })
+    # Shorter windows come for free from the daily rollup
+    for days in ROLLUP_EXTRA_WINDOWS if ANALYSIS_MODE == "rollup" else []:
+        excel_data[-1][f'AG Prod Activity ({days}d)'] = c.get(f'ag_{days}d_events', 0)
 
 df = pd.DataFrame(excel_data)
 
@@ -460,6 +1180,7 @@ with pd.ExcelWriter(excel_file, engine='openpyxl') as writer:
 print(f"✓ Excel export created: {excel_file}")
 
 # Step 3.5: Copy to OneDrive for sharing
+run_metrics.start_step("Step 3.5: OneDrive copy")
 print(f"\nStep 3.5: Copying to OneDrive...")
 print("-"*100)
 
@@ -491,6 +1212,7 @@ else:
     print(f"⚠️  OneDrive folder not found: {ONEDRIVE_FOLDER}")
 
 # Step 4: Generate and send email
+run_metrics.start_step("Step 4: Email report")
 print(f"\nStep 4: Generating enhanced email report...")
 print("-"*100)
 
@@ -820,6 +1542,7 @@ except Exception as e:
     print(f"  Excel saved: {excel_file}")
 
 # Step 5: Send Teams notification
+run_metrics.start_step("Step 5: Teams notification")
 print(f"\nStep 5: Sending Teams notification...")
 print("-"*100)
 
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark for the Scite -> VIVO import
+
+Runs synthetic corpora through the same journaled process_chunk() path as a
+normal scite_to_vivo.py import, against the local stand-ins (scite_stub.py,
+vivo_stub.py), and records per-stage wall time, papers/sec, triples/sec, peak
+RSS and bytes sent to VIVO. Each corpus size runs in a fresh process with its own
+temporary journal and a cold Scite cache, so RSS and caches do not leak between
+runs. Results are written as JSON; --compare prints the change against an
+earlier results file.
+
+Usage:
+    python benchmark.py                          # 1k, 10k and 100k DOIs
+    python benchmark.py --sizes 1000 --mode pipeline --compare benchmark_results/last.json
+    python benchmark.py --sizes 10000 --convert-workers 4 --scite-latency 0.05
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from scite_stub import SciteStubServer, SyntheticCorpus, synthetic_dois
+from stub_server import start_server
+from vivo_stub import VivoStubServer
+
+RESULTS_DIR = "benchmark_results"
+STAGES = ("fetch", "tallies", "convert", "import")
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(dois: List[str], options: Dict, env: Dict[str, str], conn) -> None:
+    """Child process: run one corpus through scite_to_vivo and send back the timings."""
+    with tempfile.TemporaryDirectory(prefix="scite_vivo_bench_") as workdir:
+        os.environ.update(env)
+        os.environ["SCITE_CACHE_PATH"] = os.path.join(workdir, "scite_cache.sqlite")
+        if not options["verbose"]:
+            sys.stdout = open(os.devnull, "w")
+        import scite_to_vivo as stv
+
+        stv.open_scite_cache()
+        stages = dict.fromkeys(STAGES, 0.0)
+        triples = failed = 0
+        started = time.perf_counter()
+
+        if options["mode"] == "pipeline":
+            failed = len(stv.run_pipeline(dois, "bench", "bench", options["fetch_workers"]))
+            triples = None
+        else:
+            journal = stv.RunJournal(os.path.join(workdir, "journal"))
+            entities = stv.EntityIndex()
+            pool = None
+            if options["convert_workers"] > 1:
+                pool = stv.new_convert_pool(options["convert_workers"])
+            for chunk in stv.iter_batches(dois, stv.RUN_CHUNK_SIZE):
+                chunk_triples, chunk_failed = stv.process_chunk(
+                    chunk,
+                    journal,
+                    options["fetch_workers"],
+                    "bench",
+                    "bench",
+                    entities=entities,
+                    convert_pool=pool,
+                    convert_workers=options["convert_workers"],
+                    timings=stages,
+                )
+                triples += chunk_triples
+                failed += len(chunk_failed)
+            if pool is not None:
+                pool.shutdown()
+
+        conn.send(
+            {
+                "total_seconds": time.perf_counter() - started,
+                "stages": stages if options["mode"] != "pipeline" else None,
+                "papers": len(dois),
+                "triples": triples,
+                "failed_batches": failed,
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+                "uri_cache": stv.uri_cache_stats(),
+            }
+        )
+        conn.close()
+
+
+def benchmark_size(size: int, args, scite: SciteStubServer, vivo: VivoStubServer) -> Dict:
+    """Benchmark one corpus size in a fresh process."""
+    env = {
+        "SCITE_API_URL": scite.url,
+        "VIVO_BASE_URL": vivo.url,
+        "SCITE_CACHE": "0" if args.no_cache else "1",
+    }
+    options = {
+        "mode": args.mode,
+        "fetch_workers": args.fetch_workers,
+        "convert_workers": args.convert_workers,
+        "verbose": args.verbose,
+    }
+    scite_before, vivo_before = dict(scite.stats), dict(vivo.stats)
+
+    ctx = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(
+        target=run_case, args=(list(synthetic_dois(size)), options, env, child_conn)
+    )
+    process.start()
+    child_conn.close()
+    result = parent_conn.recv()
+    process.join()
+
+    total = result["total_seconds"]
+    result.update(
+        {
+            "size": size,
+            "papers_per_sec": round(result["papers"] / total, 1) if total else None,
+            "triples_per_sec": (
+                round(result["triples"] / total, 1) if total and result["triples"] else None
+            ),
+            "bytes_to_vivo": vivo.stats["bytes_received"] - vivo_before.get("bytes_received", 0),
+            "bytes_from_scite": scite.stats["bytes_sent"] - scite_before.get("bytes_sent", 0),
+            "vivo_requests": vivo.stats["update_requests"]
+            - vivo_before.get("update_requests", 0),
+        }
+    )
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def print_results(runs: List[Dict]) -> None:
+    stage_headers = " ".join(f"{stage + ' s':>10}" for stage in STAGES)
+    print(
+        f"\n{'DOIs':>8} {'total s':>9} {stage_headers} "
+        f"{'papers/s':>9} {'triples/s':>10} {'RSS MB':>8} {'MB to VIVO':>11}"
+    )
+    for run in runs:
+        stages = run["stages"] or {}
+        stage_cols = " ".join(
+            f"{stages[s]:>10.2f}" if s in stages else f"{'-':>10}" for s in STAGES
+        )
+        triples_per_sec = run["triples_per_sec"] if run["triples_per_sec"] is not None else "-"
+        print(
+            f"{run['size']:>8} {run['total_seconds']:>9.2f} {stage_cols} "
+            f"{run['papers_per_sec']:>9} {triples_per_sec:>10} {run['peak_rss_mb']:>8} "
+            f"{run['bytes_to_vivo'] / 1e6:>11.1f}"
+        )
+
+
+def print_comparison(runs: List[Dict], previous_path: str) -> None:
+    """Print total time and throughput changes against an earlier results file."""
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = {run["size"]: run for run in json.load(f)["runs"]}
+    print(f"\nCompared with {previous_path}:")
+    for run in runs:
+        old = previous.get(run["size"])
+        if not old:
+            print(f"  {run['size']:>8} DOIs: no earlier run")
+            continue
+        time_change = (run["total_seconds"] - old["total_seconds"]) / old["total_seconds"]
+        rss_change = run["peak_rss_mb"] - old["peak_rss_mb"]
+        marker = "⚠️ " if time_change > 0.1 else "✓ " if time_change < -0.1 else "  "
+        print(
+            f"{marker}{run['size']:>8} DOIs: {old['total_seconds']:.2f}s -> "
+            f"{run['total_seconds']:.2f}s ({time_change:+.0%}), RSS {rss_change:+.0f} MB"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Scite -> VIVO import")
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000",
+        help="Comma-separated corpus sizes in DOIs (default: 1000,10000,100000)",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("staged", "pipeline"),
+        default="staged",
+        help="staged: time each stage of the chunked import; "
+        "pipeline: time --pipeline end to end (default: staged)",
+    )
+    parser.add_argument("--fetch-workers", type=int, default=4, help="Concurrent paper batches")
+    parser.add_argument("--convert-workers", type=int, default=1, help="RDF conversion processes")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic corpus seed")
+    parser.add_argument("--authors-max", type=int, default=8, help="Most authors per paper")
+    parser.add_argument("--author-pool", type=int, default=5000, help="Distinct authors")
+    parser.add_argument("--scite-latency", type=float, default=0.0, help="Seconds per Scite call")
+    parser.add_argument(
+        "--vivo-latency-per-kb", type=float, default=0.0, help="VIVO seconds per KB of update"
+    )
+    parser.add_argument(
+        "--vivo-store",
+        action="store_true",
+        help="Apply updates to the stub's rdflib store (slower; default only counts them)",
+    )
+    parser.add_argument(
+        "--output", help=f"Results JSON file (default: {RESULTS_DIR}/<timestamp>.json)"
+    )
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Run without the (cold) local Scite cache"
+    )
+    parser.add_argument("--verbose", action="store_true", help="Show scite_to_vivo output")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    corpus = SyntheticCorpus(args.seed, authors_max=args.authors_max, author_pool=args.author_pool)
+    scite = SciteStubServer(("127.0.0.1", 0), corpus, latency=args.scite_latency)
+    vivo = VivoStubServer(
+        ("127.0.0.1", 0), latency_per_kb=args.vivo_latency_per_kb, store=args.vivo_store
+    )
+    start_server(scite)
+    start_server(vivo)
+
+    runs = []
+    try:
+        for size in sizes:
+            print(f"Benchmarking {size} DOIs ({args.mode})...")
+            run = benchmark_size(size, args, scite, vivo)
+            runs.append(run)
+            print(f"  ✓ {run['total_seconds']:.2f}s, {run['papers_per_sec']} papers/s")
+    finally:
+        scite.shutdown()
+        vivo.shutdown()
+
+    print_results(runs)
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("output", "compare")
+        },
+        "runs": runs,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results saved to {output}")
+
+    if args.compare:
+        print_comparison(runs, args.compare)
+
+
+if __name__ == "__main__":
+    main()
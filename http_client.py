@@ -0,0 +1,77 @@
+"""
+Shared HTTP client for the Scite, VIVO and PostHog integrations
+
+Every session keeps connections alive in a bounded pool, retries idempotent
+requests (and connection failures) on transient server errors, asks for
+gzip responses, and can gzip large request bodies.
+
+Environment Variables:
+    HTTP_POOL_SIZE: Connections kept per host (default: 10)
+    HTTP_RETRIES: Retries for connection errors and idempotent requests (default: 3)
+    HTTP_BACKOFF: Backoff factor in seconds between retries (default: 0.5)
+    HTTP_GZIP_REQUESTS: Set to 1 to gzip request bodies when the server accepts it (default: 0)
+    HTTP_GZIP_MIN_BYTES: Smallest body worth compressing (default: 1024)
+"""
+
+import gzip
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))
+HTTP_GZIP_REQUESTS = os.getenv("HTTP_GZIP_REQUESTS", "0") == "1"
+HTTP_GZIP_MIN_BYTES = int(os.getenv("HTTP_GZIP_MIN_BYTES", "1024"))
+
+# 429s are left to the callers, which pace themselves from Retry-After
+RETRY_STATUSES = (502, 503, 504)
+
+
+class PooledSession(requests.Session):
+    """requests.Session that can gzip request bodies above a size threshold."""
+
+    def __init__(self, gzip_requests=False, gzip_min_bytes=HTTP_GZIP_MIN_BYTES):
+        super().__init__()
+        self.gzip_requests = gzip_requests
+        self.gzip_min_bytes = gzip_min_bytes
+        self.headers["Accept-Encoding"] = "gzip, deflate"
+
+    def prepare_request(self, request):
+        prepared = super().prepare_request(request)
+        body = prepared.body
+        if (
+            self.gzip_requests
+            and body
+            and not hasattr(body, "read")
+            and len(body) >= self.gzip_min_bytes
+            and "Content-Encoding" not in prepared.headers
+        ):
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            prepared.body = gzip.compress(body, compresslevel=5)
+            prepared.headers["Content-Encoding"] = "gzip"
+            prepared.headers["Content-Length"] = str(len(prepared.body))
+        return prepared
+
+
+def create_session(pool_size=None, retries=None, gzip_requests=None):
+    """Create a pooled session; pool_block caps concurrent connections per host."""
+    pool_size = pool_size or HTTP_POOL_SIZE
+    retry = Retry(
+        total=HTTP_RETRIES if retries is None else retries,
+        backoff_factor=HTTP_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    session = PooledSession(HTTP_GZIP_REQUESTS if gzip_requests is None else gzip_requests)
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True, max_retries=retry
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -0,0 +1,37 @@
+"""
+Append-only JSONL logs that survive being killed mid-write
+
+Shared by scite_to_vivo.py's run journal and account_monitor_enhanced.py's
+checkpoint. Each entry is fsynced as it is appended. Loading skips a torn final
+line left by an interrupted run and terminates it, so later appends start on a
+line of their own.
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+
+def load_jsonl(path: str, object_hook: Optional[Callable] = None) -> List[Dict[str, Any]]:
+    """Read every complete entry of a JSONL log, repairing a torn final line."""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line, object_hook=object_hook))
+            except ValueError:
+                continue  # Torn final line from an interrupted run
+    with open(path, "rb+") as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    return entries
+
+
+def append_jsonl(path: str, entry: Dict[str, Any], default: Optional[Callable] = None) -> None:
+    """Append one entry and fsync it before returning."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, default=default) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Local PostHog HogQL stand-in for account_monitor_enhanced.py
+
+Serves POST /api/projects/{id}/query/ over a synthetic events table in SQLite.
+The HogQL the monitor sends is translated to SQLite. person.properties.* becomes
+json_extract(), INTERVALs become seconds (timestamps are stored as epoch
+seconds), and ClickHouse functions are registered as SQLite functions and
+aggregates: countIf, uniqExactIf, any, JSONExtractString, toString, toDate,
+toDateTime and now.
+
+Both projects the monitor queries are generated. The AG project has events
+from users of synthetic companies, some of which are losing activity over
+time. The Scite project has email-only events from the same users. 429s
+(with Retry-After) and 504s can be injected at random, or 429s enforced by a
+per-project query rate, so the monitor's executor, cache and rate limiter
+can be exercised offline.
+
+Usage:
+    python posthog_stub.py --port 8010 --companies 200 --rate 2 --error-504 0.02
+    POSTHOG_HOST=http://localhost:8010 HOGQL_CACHE=0 python account_monitor_enhanced.py
+"""
+
+import argparse
+import ast
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from stub_server import StubHandler, StubServer, serve_until_stopped
+
+AG_PROJECT_ID = "78784"
+SCITE_PROJECT_ID = "91941"
+MONITOR_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "account_monitor_enhanced.py"
+)
+QUERY_PATH = re.compile(r"^/api/projects/(\w+)/query/?$")
+INTERVAL_SECONDS = {"SECOND": 1, "MINUTE": 60, "HOUR": 3600, "DAY": 86400, "WEEK": 604800}
+PERSON_PROPERTY = re.compile(r"\bperson\.properties\.(\$?\w+)")
+INTERVAL = re.compile(r"\bINTERVAL\s+(\d+)\s+(SECOND|MINUTE|HOUR|DAY|WEEK)S?\b", re.IGNORECASE)
+
+
+def monitor_event_names() -> List[str]:
+    """Event names from the monitor's EVENT_CATEGORIES, read without running the script."""
+    try:
+        with open(MONITOR_SCRIPT, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == "EVENT_CATEGORIES"
+                for target in node.targets
+            ):
+                categories = ast.literal_eval(node.value)
+                return [event for cat in categories.values() for event in cat["events"]]
+    except (OSError, SyntaxError, ValueError):
+        pass
+    return ["2", "15", "52", "53", "260", "218"]
+
+
+def translate_hogql(query: str) -> str:
+    """Rewrite the HogQL subset the monitor uses into SQLite SQL."""
+    sql = PERSON_PROPERTY.sub(
+        lambda m: f"json_extract(person_properties, '$.\"{m.group(1)}\"')", query
+    )
+    return INTERVAL.sub(
+        lambda m: f"({int(m.group(1)) * INTERVAL_SECONDS[m.group(2).upper()]})", sql
+    )
+
+
+def to_epoch(value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).replace("T", " ").rstrip("Z")
+    fmt = "%Y-%m-%d %H:%M:%S" if " " in text else "%Y-%m-%d"
+    return datetime.strptime(text[:19], fmt).replace(tzinfo=timezone.utc).timestamp()
+
+
+def json_extract_string(document, *path) -> str:
+    """ClickHouse JSONExtractString: the string at path, or '' if missing or not a string."""
+    try:
+        value = json.loads(document) if document else None
+    except ValueError:
+        return ""
+    for key in path:
+        if not isinstance(value, dict):
+            return ""
+        value = value.get(key)
+    return value if isinstance(value, str) else ""
+
+
+def to_string(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class CountIf:
+    def __init__(self):
+        self.count = 0
+
+    def step(self, condition):
+        if condition:
+            self.count += 1
+
+    def finalize(self):
+        return self.count
+
+
+class UniqExactIf:
+    def __init__(self):
+        self.values = set()
+
+    def step(self, value, condition):
+        if condition and value is not None:
+            self.values.add(value)
+
+    def finalize(self):
+        return len(self.values)
+
+
+class Any:
+    def __init__(self):
+        self.value = None
+
+    def step(self, value):
+        if self.value is None:
+            self.value = value
+
+    def finalize(self):
+        return self.value
+
+
+def register_hogql_functions(conn: sqlite3.Connection) -> None:
+    conn.create_function("now", 0, lambda: time.time())
+    conn.create_function("toDateTime", 1, to_epoch)
+    conn.create_function(
+        "toDate",
+        1,
+        lambda value: (
+            datetime.fromtimestamp(to_epoch(value), timezone.utc).date().isoformat()
+            if value is not None
+            else None
+        ),
+    )
+    conn.create_function("toString", 1, to_string)
+    conn.create_function("JSONExtractString", -1, json_extract_string)
+    conn.create_aggregate("countIf", 1, CountIf)
+    conn.create_aggregate("uniqExactIf", 2, UniqExactIf)
+    conn.create_aggregate("any", 1, Any)
+
+
+def generate_events(
+    conn: sqlite3.Connection,
+    companies: int,
+    days: int,
+    users_min: int,
+    users_max: int,
+    events_per_user_day: float,
+    seed: int,
+) -> int:
+    """Fill the events tables of both projects; returns the number of AG events."""
+    rng = random.Random(seed)
+    event_names = monitor_event_names()
+    now = time.time()
+    ag_rows, scite_rows = [], []
+
+    for company in range(1, companies + 1):
+        companyid = 1000 + company
+        domain = f"company{company}.example.com"
+        # Relative activity at the start and end of the window; some companies decline
+        start = rng.uniform(0.5, 1.5)
+        end = rng.choice([rng.uniform(0.0, 0.4), rng.uniform(0.7, 1.6)])
+        for user in range(rng.randint(users_min, users_max)):
+            email = f"user{user}@{domain}"
+            distinct_id = f"{companyid}-{user}"
+            person = json.dumps({"companyid": companyid, "email": email})
+            properties = json.dumps({"$set": {"companyid": str(companyid), "email": email}})
+            favourite = rng.sample(event_names, min(len(event_names), rng.randint(2, 6)))
+            for day in range(days):
+                level = start + (end - start) * (days - day) / days
+                for _ in range(int(rng.expovariate(1 / max(events_per_user_day * level, 1e-6)))):
+                    timestamp = now - day * 86400 - rng.uniform(0, 86400)
+                    event = rng.choice(favourite)
+                    ag_rows.append((event, timestamp, distinct_id, properties, person))
+                    if rng.random() < 0.3:
+                        scite_person = json.dumps({"email": email})
+                        scite_rows.append(
+                            ("$pageview", timestamp, distinct_id, "{}", scite_person)
+                        )
+
+    for project_id, rows in ((AG_PROJECT_ID, ag_rows), (SCITE_PROJECT_ID, scite_rows)):
+        table = f"events_{project_id}"
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(
+            f"CREATE TABLE {table} (event TEXT, timestamp REAL, distinct_id TEXT, "
+            "properties TEXT, person_properties TEXT)"
+        )
+        conn.executemany(f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?)", rows)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_timestamp ON {table} (timestamp)")
+    conn.commit()
+    return len(ag_rows)
+
+
+class PostHogStubServer(StubServer):
+    """Threaded HogQL endpoint over SQLite with 429/504 injection."""
+
+    def __init__(
+        self,
+        address,
+        conn: sqlite3.Connection,
+        latency: float = 0.0,
+        error_429: float = 0.0,
+        error_504: float = 0.0,
+        retry_after: float = 1.0,
+        rate: float = 0.0,
+        seed: int = 0,
+    ):
+        super().__init__(address, PostHogStubHandler)
+        self.conn = conn
+        self.latency = latency
+        self.error_429 = error_429
+        self.error_504 = error_504
+        self.retry_after = retry_after
+        self.rate = rate
+        self.db_lock = threading.Lock()
+        self.error_rng = random.Random(seed)
+        self.last_query = {}
+
+    def injected_error(self, project_id: str) -> Optional[int]:
+        """429 if the project exceeds --rate or the dice say so, 504 if the dice say so."""
+        with self.lock:
+            now = time.monotonic()
+            if self.rate:
+                if now - self.last_query.get(project_id, 0.0) < 1 / self.rate:
+                    return 429
+                self.last_query[project_id] = now
+            roll = self.error_rng.random()
+            if roll < self.error_429:
+                return 429
+            if roll < self.error_429 + self.error_504:
+                return 504
+        return None
+
+    def run_query(self, project_id: str, query: str) -> Dict:
+        table = f"events_{project_id}"
+        sql = re.sub(
+            r"\bFROM\s+events\b", f"FROM {table}", translate_hogql(query), flags=re.IGNORECASE
+        )
+        with self.db_lock:
+            cursor = self.conn.execute(sql)
+            rows = [list(row) for row in cursor.fetchall()]
+        columns = [column[0] for column in cursor.description]
+        return {"columns": columns, "results": rows, "hogql": query, "is_cached": False}
+
+
+class PostHogStubHandler(StubHandler):
+    def send_json(self, status: int, body: Dict, headers: Dict = None) -> None:
+        self.send(status, json.dumps(body).encode(), "application/json", headers)
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        match = QUERY_PATH.match(self.path)
+        if not match:
+            self.send_json(404, {"detail": "Not found."})
+            return
+        project_id = match.group(1)
+        try:
+            query = json.loads(body)["query"]["query"]
+        except (ValueError, KeyError, TypeError):
+            self.send_json(400, {"detail": "Expected a HogQLQuery body"})
+            return
+
+        server.count("queries")
+        if server.latency:
+            time.sleep(server.latency)
+        error = server.injected_error(project_id)
+        if error == 429:
+            server.count("throttled")
+            self.send_json(
+                429,
+                {"detail": "Request was throttled."},
+                {"Retry-After": str(int(server.retry_after))},
+            )
+            return
+        if error == 504:
+            server.count("timeouts")
+            self.send_json(504, {"detail": "Query timed out."})
+            return
+
+        try:
+            result = server.run_query(project_id, query)
+        except sqlite3.Error as e:
+            server.count("bad_queries")
+            self.send_json(400, {"type": "validation_error", "detail": str(e)})
+            return
+        server.count("rows", len(result["results"]))
+        self.send_json(200, result)
+
+
+def open_database(path: str, args) -> sqlite3.Connection:
+    """Open (generating if needed) the synthetic events database."""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    register_hogql_functions(conn)
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (f"events_{AG_PROJECT_ID}",)
+    ).fetchone()
+    if not exists or args.regenerate:
+        print("Generating synthetic events...", file=sys.stderr)
+        count = generate_events(
+            conn,
+            args.companies,
+            args.days,
+            args.users_min,
+            args.users_max,
+            args.events_per_user_day,
+            args.seed,
+        )
+        print(f"✓ Generated {count} events for {args.companies} companies", file=sys.stderr)
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local PostHog HogQL stand-in")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8010, help="Port to listen on (default: 8010)")
+    parser.add_argument(
+        "--db", default=":memory:", help="SQLite file to keep generated events in (default: memory)"
+    )
+    parser.add_argument("--regenerate", action="store_true", help="Regenerate events in --db")
+    parser.add_argument("--companies", type=int, default=100, help="Synthetic companies")
+    parser.add_argument("--users-min", type=int, default=3, help="Fewest users per company")
+    parser.add_argument("--users-max", type=int, default=15, help="Most users per company")
+    parser.add_argument("--days", type=int, default=180, help="Days of event history")
+    parser.add_argument(
+        "--events-per-user-day", type=float, default=2.0, help="Average events per user per day"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Data and error injection seed")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every query")
+    parser.add_argument(
+        "--rate", type=float, default=0.0, help="Queries/sec per project before 429s (0: no limit)"
+    )
+    parser.add_argument(
+        "--error-429", type=float, default=0.0, help="Fraction of queries answered with 429"
+    )
+    parser.add_argument(
+        "--error-504", type=float, default=0.0, help="Fraction of queries answered with 504"
+    )
+    parser.add_argument(
+        "--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s"
+    )
+    args = parser.parse_args()
+
+    conn = open_database(args.db, args)
+    server = PostHogStubServer(
+        (args.host, args.port),
+        conn,
+        args.latency,
+        args.error_429,
+        args.error_504,
+        args.retry_after,
+        args.rate,
+        args.seed,
+    )
+    print(f"✓ PostHog stub listening on {server.url}", file=sys.stderr)
+    try:
+        serve_until_stopped(server)
+    finally:
+        print(f"Stats: {dict(server.stats)}", file=sys.stderr)
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Local Scite API stand-in
+
+Serves the endpoints scite_to_vivo.py uses from a deterministic synthetic
+corpus, so imports can be benchmarked and tested without the real API:
+
+    POST /papers          ["doi", ...] -> {"papers": {"doi": {...}}}
+    POST /tallies         ["doi", ...] -> {"tallies": {"doi": {...}}}
+    GET  /tallies/{doi}   {"doi": ..., "supporting": ..., ...} (with ETag)
+
+Usage:
+    python scite_stub.py --port 8000 --latency 0.05 --error-rate 0.01
+    python scite_stub.py --write-dois 10000 > dois.csv
+    SCITE_API_URL=http://localhost:8000 python scite_to_vivo.py --csv dois.csv --output test.ttl
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import unquote
+
+from stub_server import StubHandler, StubServer, serve_until_stopped
+
+SYNTHETIC_DOI_PREFIX = "10.5555/synth."
+
+WORDS = (
+    "citation analysis evidence model protein cell network learning clinical trial "
+    "outcome cohort signal method dataset effect gene expression response therapy "
+    "measurement sample structure function survey review climate energy material "
+    "quantum neural patient risk factor association mechanism pathway temperature"
+).split()
+GIVEN_NAMES = (
+    "Ana Ben Chen Dana Emil Fatima Goran Hana Ivan Jun Kofi Lena Mateo Nadia Omar Priya "
+    "Quinn Rosa Sven Tariq Uma Viktor Wei Ximena Yusuf Zoe"
+).split()
+FAMILY_NAMES = (
+    "Abe Brown Costa Diaz Evans Fischer Garcia Haddad Ito Jensen Kim Lopez Moreau Novak "
+    "Okafor Patel Quispe Rossi Schmidt Tanaka Ueda Varga Wang Xu Yilmaz Zhang"
+).split()
+
+
+def synthetic_dois(count: int, start: int = 0) -> Iterator[str]:
+    """DOIs the synthetic corpus knows about."""
+    for i in range(start, start + count):
+        yield f"{SYNTHETIC_DOI_PREFIX}{i:08d}"
+
+
+class SyntheticCorpus:
+    """Deterministic fake papers and tallies, derived from each DOI and the seed."""
+
+    def __init__(
+        self,
+        seed: int = 0,
+        authors_min: int = 1,
+        authors_max: int = 8,
+        author_pool: int = 5000,
+        org_pool: int = 500,
+        abstract_words: int = 150,
+        missing_rate: float = 0.0,
+    ):
+        self.seed = seed
+        self.authors_min = authors_min
+        self.authors_max = authors_max
+        self.author_pool = author_pool
+        self.org_pool = org_pool
+        self.abstract_words = abstract_words
+        self.missing_rate = missing_rate
+
+    def rng(self, doi: str, salt: str = "") -> random.Random:
+        return random.Random(f"{self.seed}:{salt}:{doi.lower()}")
+
+    def author(self, index: int) -> Dict:
+        """Author index in the shared pool, so prolific authors recur across papers."""
+        rng = random.Random(f"{self.seed}:author:{index}")
+        given, family = rng.choice(GIVEN_NAMES), rng.choice(FAMILY_NAMES)
+        org = f"University of {rng.choice(WORDS).title()} {rng.randrange(self.org_pool)}"
+        author = {
+            "authorName": f"{given} {family} {index}",
+            "given": given,
+            "family": family,
+            "affiliation": org,
+        }
+        if rng.random() < 0.6:
+            digits = f"{rng.randrange(10 ** 16):016d}"
+            author["orcid"] = "-".join(digits[i : i + 4] for i in range(0, 16, 4))
+        return author
+
+    def paper(self, doi: str) -> Optional[Dict]:
+        rng = self.rng(doi)
+        if rng.random() < self.missing_rate:
+            return None
+        # Skewed author choice: a few authors appear on many papers
+        authors = []
+        for sequence in range(1, rng.randint(self.authors_min, self.authors_max) + 1):
+            index = int(self.author_pool * rng.random() ** 2)
+            authors.append({**self.author(index), "authorSequenceNumber": sequence})
+        return {
+            "doi": doi,
+            "slug": hashlib.md5(doi.lower().encode()).hexdigest()[:16],
+            "title": " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize(),
+            "abstract": " ".join(rng.choice(WORDS) for _ in range(self.abstract_words)),
+            "year": rng.randint(1990, 2025),
+            "pmid": str(rng.randint(10_000_000, 39_999_999)) if rng.random() < 0.5 else None,
+            "issns": [f"{rng.randrange(10000):04d}-{rng.randrange(10000):04d}"],
+            "authors": authors,
+        }
+
+    def tallies(self, doi: str) -> Optional[Dict]:
+        rng = self.rng(doi, "tallies")
+        if self.rng(doi).random() < self.missing_rate:
+            return None
+        supporting = rng.randint(0, 50)
+        contradicting = rng.randint(0, 5)
+        mentioning = rng.randint(0, 500)
+        return {
+            "doi": doi,
+            "supporting": supporting,
+            "contradicting": contradicting,
+            "mentioning": mentioning,
+            "total": supporting + contradicting + mentioning,
+        }
+
+
+class SciteStubServer(StubServer):
+    """Threaded HTTP server with latency/error injection and request counters."""
+
+    def __init__(
+        self,
+        address,
+        corpus: SyntheticCorpus,
+        latency: float = 0.0,
+        latency_per_doi: float = 0.0,
+        error_rate: float = 0.0,
+        batch_tallies: bool = True,
+    ):
+        super().__init__(address, SciteStubHandler)
+        self.corpus = corpus
+        self.latency = latency
+        self.latency_per_doi = latency_per_doi
+        self.error_rate = error_rate
+        self.batch_tallies = batch_tallies
+        self.error_rng = random.Random(corpus.seed)
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.error_rng.random() < self.error_rate
+
+
+class SciteStubHandler(StubHandler):
+    def send_json(self, status: int, body: Optional[Dict] = None, headers: Dict = None) -> None:
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send(status, data, "application/json", headers)
+
+    def delay(self, doi_count: int) -> None:
+        wait = self.server.latency + self.server.latency_per_doi * doi_count
+        if wait:
+            time.sleep(wait)
+
+    def read_dois(self) -> Optional[List[str]]:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            dois = json.loads(body)
+        except ValueError:
+            return None
+        return dois if isinstance(dois, list) else None
+
+    def do_POST(self):
+        # Always drain the body so the kept-alive connection stays usable
+        dois = self.read_dois()
+        if self.path not in ("/papers", "/tallies") or (
+            self.path == "/tallies" and not self.server.batch_tallies
+        ):
+            self.send_json(404, {"error": "not found"})
+            return
+        if dois is None:
+            self.send_json(400, {"error": "expected a JSON list of DOIs"})
+            return
+
+        endpoint = self.path.strip("/")
+        self.server.count(f"{endpoint}_requests")
+        self.server.count(f"{endpoint}_dois", len(dois))
+        self.delay(len(dois))
+        if self.server.should_fail():
+            self.server.count("errors")
+            self.send_json(503, {"error": "injected failure"})
+            return
+
+        if endpoint == "papers":
+            self.send_json(200, {"papers": {doi: self.server.corpus.paper(doi) for doi in dois}})
+        else:
+            self.send_json(200, {"tallies": {doi: self.server.corpus.tallies(doi) for doi in dois}})
+
+    def do_GET(self):
+        if not self.path.startswith("/tallies/"):
+            self.send_json(404, {"error": "not found"})
+            return
+        doi = unquote(self.path[len("/tallies/") :])
+        self.server.count("tally_requests")
+        self.delay(1)
+        if self.server.should_fail():
+            self.server.count("errors")
+            self.send_json(503, {"error": "injected failure"})
+            return
+
+        tallies = self.server.corpus.tallies(doi)
+        if tallies is None:
+            self.send_json(404, {"error": "unknown DOI"})
+            return
+        etag = '"' + hashlib.md5(json.dumps(tallies, sort_keys=True).encode()).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count("not_modified")
+            self.send_json(304, headers={"ETag": etag})
+            return
+        self.send_json(200, tallies, {"ETag": etag})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Scite API stand-in with a synthetic corpus")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus and error injection seed")
+    parser.add_argument("--authors-min", type=int, default=1, help="Fewest authors per paper")
+    parser.add_argument("--authors-max", type=int, default=8, help="Most authors per paper")
+    parser.add_argument(
+        "--author-pool", type=int, default=5000, help="Distinct authors shared by all papers"
+    )
+    parser.add_argument("--org-pool", type=int, default=500, help="Distinct affiliations")
+    parser.add_argument("--abstract-words", type=int, default=150, help="Words per abstract")
+    parser.add_argument(
+        "--missing-rate", type=float, default=0.0, help="Fraction of DOIs Scite does not know"
+    )
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument(
+        "--latency-per-doi", type=float, default=0.0, help="Extra seconds per DOI in a batch"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503"
+    )
+    parser.add_argument(
+        "--no-batch-tallies",
+        action="store_true",
+        help="Answer POST /tallies with 404 so clients fall back to per-DOI requests",
+    )
+    parser.add_argument(
+        "--write-dois", type=int, metavar="N", help="Print a CSV of N corpus DOIs and exit"
+    )
+    args = parser.parse_args()
+
+    if args.write_dois is not None:
+        print("doi")
+        for doi in synthetic_dois(args.write_dois):
+            print(doi)
+        return
+
+    corpus = SyntheticCorpus(
+        args.seed,
+        args.authors_min,
+        args.authors_max,
+        args.author_pool,
+        args.org_pool,
+        args.abstract_words,
+        args.missing_rate,
+    )
+    server = SciteStubServer(
+        (args.host, args.port),
+        corpus,
+        args.latency,
+        args.latency_per_doi,
+        args.error_rate,
+        not args.no_batch_tallies,
+    )
+    print(f"✓ Scite stub listening on {server.url}", file=sys.stderr)
+    try:
+        serve_until_stopped(server)
+    finally:
+        print(f"Requests: {dict(server.stats)}", file=sys.stderr)
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
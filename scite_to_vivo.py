@@ -18,15 +18,40 @@ Environment Variables:
 """
 
 import argparse
+import asyncio
+import contextlib
 import csv
+import functools
+import gzip
 import hashlib
+import io
+import itertools
+import json
+import math
+import multiprocessing
 import os
+import re
 import requests
+import sqlite3
 import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from datetime import datetime
+from urllib.parse import unquote
 from rdflib import Graph, Namespace, Literal, URIRef
 from rdflib.namespace import RDF, RDFS, XSD, FOAF
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, TextIO, Tuple, Union
+
+from http_client import create_session
+from jsonl_log import append_jsonl, load_jsonl
 
 # Define VIVO ontology namespaces
 VIVO = Namespace("http://vivoweb.org/ontology/core#")
@@ -39,72 +64,533 @@ VIVO_BASE_URL = os.getenv("VIVO_BASE_URL", "http://localhost:8080/vivo")
 VIVO_BASE = f"{VIVO_BASE_URL}/individual/"
 SCITE_API_URL = os.getenv("SCITE_API_URL", "http://localhost:8000")
 VIVO_SPARQL_UPDATE = f"{VIVO_BASE_URL}/api/sparqlUpdate"
+VIVO_SPARQL_QUERY = f"{VIVO_BASE_URL}/api/sparqlQuery"
 VIVO_EMAIL = os.getenv("VIVO_EMAIL", "vivo_root@mydomain.edu")
 VIVO_PASSWORD = os.getenv("VIVO_PASSWORD", "")
+SCITE_BATCH_SIZE = 500  # Maximum DOIs per Scite batch request
+SCITE_MAX_RETRIES = 3  # Attempts per paper batch before giving up on it
+SCITE_PAPER_WORKERS = int(os.getenv("SCITE_PAPER_WORKERS", "4"))
+SCITE_TALLIES_WORKERS = int(os.getenv("SCITE_TALLIES_WORKERS", "8"))
+CONVERT_WORKERS = int(os.getenv("CONVERT_WORKERS", "1"))  # Processes for RDF conversion
+
+# VIVO import batching; batch size adapts to keep each update near the target latency
+VIVO_GRAPH = "http://vitro.mannlib.cornell.edu/default/vitro-kb-2"
+VIVO_BATCH_TRIPLES = int(os.getenv("VIVO_BATCH_TRIPLES", "5000"))
+VIVO_MAX_BATCH_TRIPLES = int(os.getenv("VIVO_MAX_BATCH_TRIPLES", "50000"))
+VIVO_MAX_BATCH_BYTES = int(os.getenv("VIVO_MAX_BATCH_BYTES", str(8 * 1024 * 1024)))
+VIVO_TARGET_LATENCY = float(os.getenv("VIVO_TARGET_LATENCY", "10"))
+VIVO_MIN_BATCH_TRIPLES = int(os.getenv("VIVO_MIN_BATCH_TRIPLES", "100"))
+VIVO_MAX_RETRIES = 3
+# Too large (413) or too slow (client timeout 408, gateway timeout 504): split, don't resend
+VIVO_SPLIT_STATUSES = (408, 413, 504)
+# Sleep between retries of Scite and VIVO requests; tests replace it to skip the backoff
+retry_sleep = time.sleep
+
+# Local Scite response cache (set SCITE_CACHE=0 or pass --no-cache to disable)
+SCITE_CACHE = os.getenv("SCITE_CACHE", "1") != "0"
+SCITE_CACHE_PATH = os.getenv(
+    "SCITE_CACHE_PATH", os.path.expanduser("~/.cache/scite_vivo/scite_cache.sqlite")
+)
+SCITE_PAPER_TTL = float(os.getenv("SCITE_PAPER_TTL_DAYS", "30")) * 86400
+SCITE_TALLIES_TTL = float(os.getenv("SCITE_TALLIES_TTL_HOURS", "24")) * 3600
+SCITE_CACHE_MAX_ENTRIES = int(os.getenv("SCITE_CACHE_MAX_ENTRIES", "1000000"))
+CACHE_LOOKUP_CHUNK = 500  # DOIs per SELECT, below SQLite's bound-parameter limit
+
+# Journaled runs: DOIs are processed in chunks whose progress is recorded for --resume
+RUN_CHUNK_SIZE = int(os.getenv("RUN_CHUNK_SIZE", "5000"))
+RUN_JOURNAL_DIR = os.getenv("RUN_JOURNAL_DIR", ".scite_vivo_journal")
+
+# Tallies-only refresh: Scite tally field -> VIVO property, and publications per request
+TALLY_PROPERTIES = {
+    "supporting": VIVO["sciteSupportingCites"],
+    "contradicting": VIVO["sciteContrastingCites"],
+    "mentioning": VIVO["sciteMentioningCites"],
+    "total": VIVO["sciteTotalCites"],
+}
+TALLIES_UPDATE_BATCH = int(os.getenv("TALLIES_UPDATE_BATCH", "200"))
+
+# Delta sync manifest of per-publication content hashes
+SYNC_MANIFEST = os.getenv("SYNC_MANIFEST", "scite_vivo_manifest.sqlite")
+# Subjects minted from a DOI belong to that publication; people/orgs/positions are shared
+OWNED_PREFIXES = ("pub-", "date-", "authorship-")
+# Pipeline mode: paper batches each stage may buffer before the previous one waits
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+# Shared entity URIs recur across papers, so their minting is memoized (bounded LRU)
+MEMOIZED_URI_PREFIXES = ("person-", "org-", "position-")
+URI_CACHE_SIZE = int(os.getenv("URI_CACHE_SIZE", "200000"))
+
+# Keep-alive sessions; the Scite pool is sized so every fetch worker has a connection
+scite_session = create_session(pool_size=max(SCITE_PAPER_WORKERS, SCITE_TALLIES_WORKERS))
+vivo_session = create_session()
+
+# Set to False once the Scite API reports it has no batch tallies endpoint
+_batch_tallies_supported = True
+
+
+class SciteCache:
+    """SQLite cache of Scite paper and tally responses keyed by normalized DOI."""
+
+    def __init__(self, path: str, max_entries: int, clock: Callable[[], float] = time.time):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scite_cache (
+                kind TEXT, doi TEXT, body TEXT, etag TEXT, fetched_at REAL, accessed_at REAL,
+                PRIMARY KEY (kind, doi)
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS scite_cache_lru ON scite_cache (accessed_at)")
+
+    @staticmethod
+    def key(doi: str) -> str:
+        return normalize_doi(doi)
+
+    def get_many(
+        self, kind: str, dois: Iterable[str], ttl: float = None
+    ) -> Dict[str, Tuple[Dict, Optional[str], float]]:
+        """Return {normalized DOI: (body, etag, age in seconds)} for cached responses.
+
+        With ttl only entries younger than ttl are returned. Each chunk of DOIs is one
+        SELECT, and its hits are marked as used with one UPDATE and one commit.
+        """
+        keys = list(dict.fromkeys(self.key(doi) for doi in dois))
+        max_age = ttl if ttl is not None else math.inf
+        entries = {}
+        with self.lock:
+            for start in range(0, len(keys), CACHE_LOOKUP_CHUNK):
+                chunk = keys[start : start + CACHE_LOOKUP_CHUNK]
+                now = self.clock()
+                rows = self.conn.execute(
+                    "SELECT doi, body, etag, fetched_at FROM scite_cache "
+                    f"WHERE kind = ? AND doi IN ({', '.join('?' * len(chunk))})",
+                    (kind, *chunk),
+                ).fetchall()
+                hits = [row for row in rows if now - row[3] < max_age]
+                if not hits:
+                    continue
+                self.conn.executemany(
+                    "UPDATE scite_cache SET accessed_at = ? WHERE kind = ? AND doi = ?",
+                    [(now, kind, row[0]) for row in hits],
+                )
+                self.conn.commit()
+                for doi, body, etag, fetched_at in hits:
+                    entries[doi] = (json.loads(body), etag, now - fetched_at)
+        return entries
+
+    def get(self, kind: str, doi: str) -> Optional[Tuple[Dict, Optional[str], float]]:
+        """Return (body, etag, age in seconds) for a cached response, fresh or not."""
+        return self.get_many(kind, [doi]).get(self.key(doi))
+
+    def get_fresh(self, kind: str, dois: List[str], ttl: float) -> Dict[str, Dict]:
+        """Return {normalized DOI: body} for entries younger than ttl."""
+        return {doi: entry[0] for doi, entry in self.get_many(kind, dois, ttl).items()}
+
+    def put(self, kind: str, items: Dict[str, Dict], etags: Dict[str, str] = None) -> None:
+        """Store a batch of responses with a single commit."""
+        if not items:
+            return
+        now = self.clock()
+        etags = etags or {}
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO scite_cache VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (kind, self.key(doi), json.dumps(body), etags.get(doi), now, now)
+                    for doi, body in items.items()
+                ],
+            )
+            # Evict least recently used entries beyond the size limit
+            excess = self.conn.execute("SELECT COUNT(*) FROM scite_cache").fetchone()[0]
+            excess -= self.max_entries
+            if excess > 0:
+                self.conn.execute(
+                    "DELETE FROM scite_cache WHERE rowid IN "
+                    "(SELECT rowid FROM scite_cache ORDER BY accessed_at LIMIT ?)",
+                    (excess,),
+                )
+            self.conn.commit()
+
+    def touch(self, kind: str, dois: Iterable[str]) -> None:
+        """Mark entries as revalidated (e.g. after a 304 Not Modified)."""
+        now = self.clock()
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE scite_cache SET fetched_at = ?, accessed_at = ? WHERE kind = ? AND doi = ?",
+                [(now, now, kind, self.key(doi)) for doi in dois],
+            )
+            self.conn.commit()
 
 
-def create_uri(prefix: str, identifier: str) -> URIRef:
-    """Create a URI from a prefix and identifier."""
+# Opened by main() once the flags are parsed, so importing this module (as every
+# spawned convert worker does) never creates or opens the cache file
+scite_cache: Optional[SciteCache] = None
+
+
+def open_scite_cache() -> None:
+    """Open the local Scite cache unless SCITE_CACHE=0."""
+    global scite_cache
+    if SCITE_CACHE and scite_cache is None:
+        scite_cache = SciteCache(SCITE_CACHE_PATH, SCITE_CACHE_MAX_ENTRIES)
+
+
+def mint_uri(prefix: str, identifier: str) -> URIRef:
+    """Hash an identifier into a URI under the VIVO individual namespace."""
     hash_id = hashlib.md5(identifier.encode()).hexdigest()[:12]
     return URIRef(f"{VIVO_BASE}{prefix}{hash_id}")
 
 
-def query_scite_papers(dois: List[str]) -> Dict[str, Any]:
-    """Query Scite API for papers by DOI."""
-    print(f"Querying Scite API for {len(dois)} papers...")
+memoized_uri = functools.lru_cache(maxsize=URI_CACHE_SIZE)(mint_uri)
+
+
+def create_uri(prefix: str, identifier: str) -> URIRef:
+    """Create a URI from a prefix and identifier."""
+    if prefix in MEMOIZED_URI_PREFIXES:
+        return memoized_uri(prefix, identifier)
+    return mint_uri(prefix, identifier)
+
+
+def uri_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counts for memoized person/org/position URIs."""
+    info = memoized_uri.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+    }
+
+
+def print_uri_cache_stats() -> None:
+    """Report how many entity URI mintings the memo saved."""
+    stats = uri_cache_stats()
+    if stats["hits"] or stats["misses"]:
+        print(
+            f"URI cache: {stats['hits']} hits / {stats['hits'] + stats['misses']} lookups "
+            f"({stats['hit_rate']:.0%}), {stats['size']} entries"
+        )
+
+
+DOI_PREFIX_PATTERN = re.compile(
+    r"^(?:https?://(?:dx\.|www\.)?doi\.org/|doi:\s*)", re.IGNORECASE
+)
+
+
+def normalize_doi(doi: str) -> str:
+    """Canonical DOI form: no resolver/doi: prefix, URL-decoded, trimmed and lowercased."""
+    doi = doi.strip()
+    stripped = DOI_PREFIX_PATTERN.sub("", doi)
+    if stripped != doi:
+        doi = unquote(stripped)
+    return doi.strip().lower()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter for approximate membership of very large DOI sets."""
 
-    # Batch fetch papers (up to 500 at once)
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> bool:
+        """Add item, returning True if it was (probably) already present."""
+        present = True
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        return present
+
+
+def iter_unique_dois(dois: Iterable[str], bloom_capacity: int = None) -> Iterator[str]:
+    """Normalize DOIs and drop invalid entries and duplicates before anything is fetched.
+
+    An exact seen-set of 8-byte digests is used by default; with bloom_capacity a Bloom
+    filter bounds memory instead, at the cost of occasionally dropping a unique DOI.
+    """
+    bloom = BloomFilter(bloom_capacity) if bloom_capacity else None
+    seen = set()
+    duplicates = invalid = 0
+    for doi in dois:
+        doi = normalize_doi(doi)
+        if not doi.startswith("10."):
+            invalid += 1
+            continue
+        if bloom is not None:
+            if bloom.add(doi):
+                duplicates += 1
+                continue
+        else:
+            digest = hashlib.md5(doi.encode()).digest()[:8]
+            if digest in seen:
+                duplicates += 1
+                continue
+            seen.add(digest)
+        yield doi
+    if duplicates or invalid:
+        print(f"  Skipped {duplicates} duplicate and {invalid} invalid DOIs")
+
+
+def fetch_paper_batch(dois: List[str], failed: List[str] = None) -> List[Dict]:
+    """Fetch one batch of papers from Scite, retrying with exponential backoff.
+
+    A batch that still fails is returned empty and its DOIs are added to failed.
+    """
     url = f"{SCITE_API_URL}/papers"
 
-    try:
-        response = requests.post(url, json=dois, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+    for attempt in range(SCITE_MAX_RETRIES):
+        try:
+            response = scite_session.post(url, json=dois, timeout=30)
+            response.raise_for_status()
+
+            # API returns {"papers": {"doi1": {...}, "doi2": {...}}}
+            papers_dict = response.json().get("papers", {})
+            papers_dict = {doi: paper for doi, paper in papers_dict.items() if paper}
+            if scite_cache:
+                scite_cache.put("paper", papers_dict)
+            return list(papers_dict.values())
+
+        except requests.exceptions.RequestException as e:
+            if attempt == SCITE_MAX_RETRIES - 1:
+                print(f"✗ Error querying Scite API for batch of {len(dois)} DOIs: {e}")
+                if failed is not None:
+                    failed.extend(dois)
+                return []
+            wait_time = 2 ** (attempt + 1)
+            print(f"  Warning: Scite batch failed ({e}), retrying in {wait_time}s...")
+            retry_sleep(wait_time)
+
+
+def iter_batches(items: Iterable, size: int) -> Iterator[List]:
+    """Lazily group an iterable into lists of at most size items."""
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_scite_papers(
+    dois: Iterable[str], workers: int = SCITE_PAPER_WORKERS, failed: List[str] = None
+) -> Iterator[List[Dict]]:
+    """Yield batches of papers from Scite as each API-sized chunk completes.
+
+    DOIs are consumed lazily, with at most two batches per worker in flight. DOIs
+    of batches that could not be fetched are added to failed.
+    """
+    print("Querying Scite API for papers...")
+    requested = from_cache = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        for batch in iter_batches(dois, SCITE_BATCH_SIZE):
+            if scite_cache:
+                cached = scite_cache.get_fresh("paper", batch, SCITE_PAPER_TTL)
+                if cached:
+                    from_cache += len(cached)
+                    yield list(cached.values())
+                    batch = [doi for doi in batch if SciteCache.key(doi) not in cached]
+            if not batch:
+                continue
 
-        # API returns {"papers": {"doi1": {...}, "doi2": {...}}}
-        papers_dict = data.get("papers", {})
-        print(f"✓ Retrieved {len(papers_dict)} papers from Scite")
+            requested += len(batch)
+            in_flight.add(pool.submit(fetch_paper_batch, batch, failed))
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
 
-        # Convert to list for easier processing
-        papers_list = []
-        for doi, paper_data in papers_dict.items():
-            if paper_data:  # Skip None entries
-                papers_list.append(paper_data)
+        for future in as_completed(in_flight):
+            yield future.result()
+    print(f"  Requested {requested} papers from Scite API, {from_cache} served from local cache")
 
-        return papers_list
 
-    except requests.exceptions.RequestException as e:
-        print(f"✗ Error querying Scite API: {e}")
-        return []
+def query_scite_papers(dois: List[str], workers: int = SCITE_PAPER_WORKERS) -> List[Dict]:
+    """Query Scite API for papers by DOI."""
+    papers_list = [paper for batch in iter_scite_papers(dois, workers) for paper in batch]
+    print(f"✓ Retrieved {len(papers_list)} papers from Scite")
+    return papers_list
+
 
+def query_scite_tallies(
+    doi: str, cached: Optional[Tuple[Dict, Optional[str], float]] = None
+) -> Tuple[Dict[str, Any], Optional[str], bool]:
+    """Query Scite API for citation tallies by DOI.
 
-def query_scite_tallies(doi: str) -> Dict[str, Any]:
-    """Query Scite API for citation tallies by DOI."""
+    An expired cache entry is revalidated with its ETag instead of being refetched.
+    Returns (tallies, etag, not_modified); tallies is {} for a DOI Scite does not
+    know and None when the request failed. The caller stores the result in the cache.
+    """
     url = f"{SCITE_API_URL}/tallies/{doi}"
+    request_headers = {"If-None-Match": cached[1]} if cached and cached[1] else {}
 
     try:
-        response = requests.get(url, timeout=10)
+        response = scite_session.get(url, headers=request_headers, timeout=10)
+        if response.status_code == 304 and cached:
+            return cached[0], cached[1], True
+        if response.status_code == 404:
+            return {}, None, False
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return response.json(), response.headers.get("ETag"), False
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"  Warning: Could not fetch tallies for {doi}: {e}")
-        return {}
+        return None, None, False
 
 
-def create_person_rdf(graph: Graph, author: Dict, author_uri: URIRef) -> None:
-    """Add a person (author) to the RDF graph."""
-    # Person type
-    graph.add((author_uri, RDF.type, FOAF.Person))
+def query_scite_tallies_each(dois: List[str], failed: List[str] = None) -> Dict[str, Dict]:
+    """Fetch tallies one DOI at a time with bounded concurrent GETs over the pooled session.
+
+    DOIs whose request failed are added to failed.
+    """
+    stale = scite_cache.get_many("tallies", dois) if scite_cache else {}
+    with ThreadPoolExecutor(max_workers=SCITE_TALLIES_WORKERS) as pool:
+        results = pool.map(
+            lambda doi: query_scite_tallies(doi, stale.get(normalize_doi(doi))), dois
+        )
+        tallies, etags, revalidated = {}, {}, []
+        for doi, (tally, etag, not_modified) in zip(dois, results):
+            if tally is None and failed is not None:
+                failed.append(doi)
+            if not tally:
+                continue
+            tallies[normalize_doi(doi)] = tally
+            if not_modified:
+                revalidated.append(doi)
+            else:
+                etags[normalize_doi(doi)] = etag
+    if scite_cache:
+        scite_cache.put("tallies", {doi: tallies[doi] for doi in etags}, etags)
+        scite_cache.touch("tallies", revalidated)
+    return tallies
+
+
+def query_scite_tallies_batch(dois: List[str]) -> Tuple[Dict[str, Dict], List[str]]:
+    """Query the Scite batch tallies endpoint; returns (tallies, DOIs it could not fetch).
+
+    A failed chunk only leaves its own DOIs unfetched. Once the API answers 404/405
+    it has no batch endpoint, and every remaining DOI is left for per-DOI requests.
+    """
+    global _batch_tallies_supported
+    url = f"{SCITE_API_URL}/tallies"
+    tallies, unfetched = {}, []
+    for start in range(0, len(dois), SCITE_BATCH_SIZE):
+        batch = dois[start : start + SCITE_BATCH_SIZE]
+        if not _batch_tallies_supported:
+            unfetched.extend(batch)
+            continue
+        try:
+            response = scite_session.post(url, json=batch, timeout=30)
+            if response.status_code in (404, 405):
+                print("  Scite API has no batch tallies endpoint, fetching per DOI")
+                _batch_tallies_supported = False
+                unfetched.extend(batch)
+                continue
+            response.raise_for_status()
+            # API returns {"tallies": {"doi1": {...}, "doi2": {...}}}
+            batch_tallies = response.json().get("tallies") or {}
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"  Warning: Batch tallies request for {len(batch)} DOIs failed: {e}")
+            unfetched.extend(batch)
+            continue
+
+        for doi, tally in batch_tallies.items():
+            if tally:
+                tallies[normalize_doi(doi)] = tally
+    return tallies, unfetched
+
+
+def fetch_tallies(
+    dois: List[str], use_cached: bool = True, failed: List[str] = None
+) -> Dict[str, Dict]:
+    """Fetch tallies for many DOIs, keyed by normalized DOI.
+
+    With use_cached=False fresh cache entries are ignored. The batch endpoint always
+    refetches; stored ETags are only used to revalidate on the per-DOI fallback path.
+    DOIs whose tallies could not be fetched are added to failed, so callers can
+    tell them apart from papers that have no tallies.
+    """
+    print(f"Fetching Scite tallies for {len(dois)} papers...")
+
+    cached = {}
+    if scite_cache and use_cached:
+        cached = scite_cache.get_fresh("tallies", dois, SCITE_TALLIES_TTL)
+        dois = [doi for doi in dois if SciteCache.key(doi) not in cached]
+
+    tallies, unfetched = query_scite_tallies_batch(dois) if dois else ({}, [])
+    if scite_cache:
+        scite_cache.put("tallies", tallies)
+    if unfetched:
+        # Only DOIs the batch endpoint did not answer for are fetched one at a time
+        tallies.update(query_scite_tallies_each(unfetched, failed))
+
+    print(f"✓ Retrieved tallies for {len(tallies)} papers ({len(cached)} from cache)")
+    tallies.update(cached)
+    return tallies
+
+
+class EntityIndex:
+    """Person, organization and position URIs already described during this run.
+
+    Bounded like the URI memo: past max_size URIs the least recently seen one is
+    forgotten, and described again (with identical triples) if it comes back.
+    """
 
+    def __init__(self, max_size: int = URI_CACHE_SIZE):
+        self.uris = OrderedDict()
+        self.max_size = max_size
+        self.reused = 0
+
+    def __contains__(self, uri: URIRef) -> bool:
+        return uri in self.uris
+
+    def remember(self, uri: URIRef) -> None:
+        self.uris[uri] = None
+        self.uris.move_to_end(uri)
+        if len(self.uris) > self.max_size:
+            self.uris.popitem(last=False)
+
+    def first_time(self, uri: URIRef) -> bool:
+        """True the first time a URI is seen; later sightings only count as reuse."""
+        first = uri not in self.uris
+        if not first:
+            self.reused += 1
+        self.remember(uri)
+        return first
+
+
+def create_person_rdf(
+    graph: Graph, author: Dict, author_uri: URIRef, entities: EntityIndex = None
+) -> None:
+    """Add a person (author) to the RDF graph, skipping entities already in the index."""
     # Name - local API uses 'authorName'
     author_name = (
         author.get("authorName") or f"{author.get('given', '')} {author.get('family', '')}".strip()
     )
-    if author_name:
-        graph.add((author_uri, RDFS.label, Literal(author_name)))
-        graph.add((author_uri, FOAF.name, Literal(author_name)))
 
-    # ORCID - local API may include this
+    if entities is None or entities.first_time(author_uri):
+        # Person type
+        graph.add((author_uri, RDF.type, FOAF.Person))
+
+        if author_name:
+            graph.add((author_uri, RDFS.label, Literal(author_name)))
+            graph.add((author_uri, FOAF.name, Literal(author_name)))
+
+    # ORCID - local API may include this. Written for every occurrence, since the
+    # first paper seen for an author may be the one without it
     orcid = author.get("orcid") or author.get("author_orcid")
     if orcid:
         graph.add((author_uri, VIVO.orcidId, Literal(orcid)))
@@ -113,24 +599,29 @@ def create_person_rdf(graph: Graph, author: Dict, author_uri: URIRef) -> None:
     affiliation_name = author.get("affiliation")
     if affiliation_name:
         org_uri = create_uri("org-", affiliation_name)
-        graph.add((org_uri, RDF.type, FOAF.Organization))
-        graph.add((org_uri, RDFS.label, Literal(affiliation_name)))
+        if entities is None or entities.first_time(org_uri):
+            graph.add((org_uri, RDF.type, FOAF.Organization))
+            graph.add((org_uri, RDFS.label, Literal(affiliation_name)))
 
         # Create position relationship
         position_uri = create_uri("position-", f"{author_name}-{affiliation_name}")
-        graph.add((position_uri, RDF.type, VIVO.Position))
-        graph.add((position_uri, VIVO.relates, author_uri))
-        graph.add((position_uri, VIVO.relates, org_uri))
+        if entities is None or entities.first_time(position_uri):
+            graph.add((position_uri, RDF.type, VIVO.Position))
+            graph.add((position_uri, VIVO.relates, author_uri))
+            graph.add((position_uri, VIVO.relates, org_uri))
 
 
-def create_publication_rdf(graph: Graph, paper: Dict, tallies: Dict = None) -> URIRef:
-    """Add a publication to the RDF graph."""
+def create_publication_rdf(
+    graph: Graph, paper: Dict, tallies: Dict = None, entities: EntityIndex = None
+) -> URIRef:
+    """Add a publication to the RDF graph; authors in entities are only linked."""
     doi = paper.get("doi")
     if not doi:
         return None
 
-    # Create publication URI
-    pub_uri = create_uri("pub-", doi)
+    # Create publication URI from the normalized DOI so case/prefix variants coincide
+    doi_key = normalize_doi(doi)
+    pub_uri = create_uri("pub-", doi_key)
 
     # Publication type
     graph.add((pub_uri, RDF.type, BIBO.AcademicArticle))
@@ -153,7 +644,7 @@ def create_publication_rdf(graph: Graph, paper: Dict, tallies: Dict = None) -> U
     # Year
     year = paper.get("year")
     if year:
-        date_uri = create_uri("date-", f"{doi}-{year}")
+        date_uri = create_uri("date-", f"{doi_key}-{year}")
         graph.add((date_uri, RDF.type, VIVO.DateTimeValue))
         graph.add(
             (date_uri, VIVO.dateTime, Literal(f"{year}-01-01T00:00:00", datatype=XSD.dateTime))
@@ -213,10 +704,10 @@ def create_publication_rdf(graph: Graph, paper: Dict, tallies: Dict = None) -> U
             )
             if author_name:
                 author_uri = create_uri("person-", author_name)
-                create_person_rdf(graph, author_data, author_uri)
+                create_person_rdf(graph, author_data, author_uri, entities)
 
                 # Create authorship
-                authorship_uri = create_uri("authorship-", f"{doi}-{author_name}")
+                authorship_uri = create_uri("authorship-", f"{doi_key}-{author_name}")
                 graph.add((authorship_uri, RDF.type, VIVO.Authorship))
                 graph.add((authorship_uri, VIVO.relates, pub_uri))
                 graph.add((authorship_uri, VIVO.relates, author_uri))
@@ -229,10 +720,8 @@ def create_publication_rdf(graph: Graph, paper: Dict, tallies: Dict = None) -> U
     return pub_uri
 
 
-def papers_to_rdf(papers: List[Dict]) -> Graph:
-    """Convert Scite papers data to VIVO RDF graph."""
-    print(f"Converting {len(papers)} papers to VIVO RDF...")
-
+def new_graph() -> Graph:
+    """Create an empty RDF graph with the VIVO namespaces bound."""
     graph = Graph()
 
     # Bind namespaces
@@ -241,6 +730,25 @@ def papers_to_rdf(papers: List[Dict]) -> Graph:
     graph.bind("vcard", VCARD)
     graph.bind("obo", OBO)
     graph.bind("foaf", FOAF)
+    return graph
+
+
+def papers_to_rdf(
+    papers: List[Dict],
+    tallies: Dict[str, Dict] = None,
+    graph: Graph = None,
+    entities: EntityIndex = None,
+) -> Graph:
+    """Convert Scite papers data to VIVO RDF graph (optionally adding to an existing one)."""
+    if entities is None:
+        entities = EntityIndex()
+    if tallies is None:
+        tallies = fetch_tallies([paper["doi"] for paper in papers if paper.get("doi")])
+
+    print(f"Converting {len(papers)} papers to VIVO RDF...")
+
+    if graph is None:
+        graph = new_graph()
 
     for idx, paper in enumerate(papers, 1):
         try:
@@ -248,11 +756,8 @@ def papers_to_rdf(papers: List[Dict]) -> Graph:
             if not doi:
                 continue
 
-            # Fetch tallies for this paper
-            tallies = query_scite_tallies(doi)
-
             # Create publication RDF
-            create_publication_rdf(graph, paper, tallies)
+            create_publication_rdf(graph, paper, tallies.get(normalize_doi(doi)), entities)
 
             if idx % 10 == 0:
                 print(f"  Processed {idx}/{len(papers)} papers...")
@@ -260,47 +765,551 @@ def papers_to_rdf(papers: List[Dict]) -> Graph:
         except Exception as e:
             print(f"  Warning: Error processing paper {paper.get('doi')}: {e}")
 
-    print(f"✓ Generated RDF graph with {len(graph)} triples")
+    print(
+        f"✓ Generated RDF graph with {len(graph)} triples "
+        f"({len(entities.uris)} people/orgs/positions, {entities.reused} reused)"
+    )
     return graph
 
 
-def import_to_vivo(graph: Graph, email: str, password: str) -> bool:
-    """Import RDF graph to VIVO via SPARQL UPDATE."""
-    print(f"Importing {len(graph)} triples to VIVO...")
+def convert_shard(papers: List[Dict], tallies: Dict[str, Dict]) -> str:
+    """Process pool worker: convert one shard of papers to N-Triples."""
+    graph = new_graph()
+    entities = EntityIndex()
+    for paper in papers:
+        try:
+            create_publication_rdf(
+                graph, paper, tallies.get(normalize_doi(paper["doi"])), entities
+            )
+        except Exception as e:
+            print(f"  Warning: Error processing paper {paper.get('doi')}: {e}")
+    return graph.serialize(format="nt")
 
-    # Serialize to N-Triples format (uses full URIs, no prefixes)
-    # This is required for SPARQL INSERT DATA statements
-    ntriples_data = graph.serialize(format="nt")
 
-    # VIVO stores user data in the vitro-kb-2 graph
-    # Create SPARQL UPDATE query targeting the correct graph
-    sparql_update = f"""
-    INSERT DATA {{
-        GRAPH <http://vitro.mannlib.cornell.edu/default/vitro-kb-2> {{
-            {ntriples_data}
-        }}
-    }}
+def new_convert_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool for parallel conversion."""
+    # spawn, since forking after the fetch threads and SQLite cache exist is unsafe
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def papers_to_ntriples_parallel(
+    papers: List[Dict],
+    pool: ProcessPoolExecutor,
+    workers: int,
+    entities: EntityIndex = None,
+    tallies: Dict[str, Dict] = None,
+) -> str:
+    """Convert papers to N-Triples across a process pool and merge the shards.
+
+    Each worker only knows its own shard, so authors and orgs shared between
+    shards are described more than once; the merge drops the duplicate lines and
+    any description of entities that entities says an earlier chunk already sent,
+    except their per-occurrence ORCIDs.
     """
+    papers = [paper for paper in papers if paper.get("doi")]
+    if not papers:
+        return ""
+    if tallies is None:
+        tallies = fetch_tallies([paper["doi"] for paper in papers])
+
+    # A few shards per worker keeps the pool busy when papers vary in size
+    shard_count = workers * 4
+    shard_size = max(1, math.ceil(len(papers) / shard_count))
+    print(f"Converting {len(papers)} papers to VIVO RDF in {workers} processes...")
+    futures = []
+    for shard in iter_batches(papers, shard_size):
+        shard_tallies = {
+            normalize_doi(paper["doi"]): tallies[normalize_doi(paper["doi"])]
+            for paper in shard
+            if normalize_doi(paper["doi"]) in tallies
+        }
+        futures.append(pool.submit(convert_shard, shard, shard_tallies))
+
+    entity_prefixes = tuple(f"{VIVO_BASE}{prefix}" for prefix in MEMOIZED_URI_PREFIXES)
+    orcid_predicate = f"<{VIVO.orcidId}>"
+    merged, new_entities, reused = {}, set(), set()
+    for future in futures:
+        for line in future.result().splitlines():
+            if not line.strip() or line in merged:
+                continue
+            subject, predicate, _ = line.split(" ", 2)
+            subject = subject[1:-1]
+            if entities is not None and subject.startswith(entity_prefixes):
+                uri = URIRef(subject)
+                if uri in entities:
+                    reused.add(uri)
+                    if predicate != orcid_predicate:
+                        continue
+                else:
+                    new_entities.add(uri)
+            merged[line] = None
+
+    if entities is not None:
+        entities.reused += len(reused)
+        for uri in new_entities:
+            entities.remember(uri)
+    print(f"✓ Merged {len(futures)} shards into {len(merged)} triples")
+    return "".join(f"{line}\n" for line in merged)
+
+
+def paper_to_ntriples(paper: Dict, tallies: Dict = None, entities: EntityIndex = None) -> str:
+    """Serialize a single paper to N-Triples using a throwaway per-paper graph."""
+    graph = Graph()
+    create_publication_rdf(graph, paper, tallies, entities)
+    return graph.serialize(format="nt")
+
+
+def iter_paper_ntriples(
+    paper_batches: Iterable[List[Dict]], entities: EntityIndex = None
+) -> Iterator[str]:
+    """Yield N-Triples for one paper at a time as batches of papers arrive.
+
+    Authors, organizations and positions are described only the first time they
+    appear; later papers just link to them. The EntityIndex is bounded, so memory
+    stays flat however many authors stream past.
+    """
+    if entities is None:
+        entities = EntityIndex()
+    paper_count = 0
+    for papers in paper_batches:
+        if not papers:
+            continue
+        tallies = fetch_tallies([paper["doi"] for paper in papers if paper.get("doi")])
+        for paper in papers:
+            try:
+                if not paper.get("doi"):
+                    continue
+                ntriples = paper_to_ntriples(
+                    paper, tallies.get(normalize_doi(paper["doi"])), entities
+                )
+            except Exception as e:
+                print(f"  Warning: Error processing paper {paper.get('doi')}: {e}")
+                continue
+            paper_count += 1
+            yield ntriples
+        print(f"  Converted {paper_count} papers...")
 
+
+def stream_rdf(paper_batches: Iterable[List[Dict]], out: TextIO) -> int:
+    """Write N-Triples to out one paper at a time, keeping memory flat; returns triple count."""
+
+    def flushed(batches: Iterable[List[Dict]]) -> Iterator[List[Dict]]:
+        # The next batch is only requested once every paper of this one is written, so
+        # flushing here means an interrupted run keeps all the batches it finished
+        for papers in batches:
+            yield papers
+            out.flush()
+
+    triple_count = 0
+    for ntriples in iter_paper_ntriples(flushed(paper_batches)):
+        out.write(ntriples)
+        triple_count += ntriples.count("\n")
+
+    print(f"✓ Streamed {triple_count} triples")
+    return triple_count
+
+
+def post_sparql_update(sparql_update: str, email: str, password: str) -> int:
+    """Send one SPARQL UPDATE request to VIVO.
+
+    Returns the HTTP status code, 408 if the request timed out on our side and 0
+    for any other connection error.
+    """
     try:
-        response = requests.post(
+        response = vivo_session.post(
             VIVO_SPARQL_UPDATE,
             data={"update": sparql_update, "email": email, "password": password},
-            timeout=60,
+            timeout=max(60, VIVO_TARGET_LATENCY * 6),
         )
 
         if response.status_code == 200:
-            print("✓ Successfully imported data to VIVO")
-            return True
+            return 200
+        print(f"  ✗ VIVO returned status code {response.status_code}")
+        print(f"  Response: {response.text[:500]}")
+        return response.status_code
+
+    except requests.exceptions.Timeout as e:
+        print(f"  ✗ VIVO update timed out: {e}")
+        return 408
+    except requests.exceptions.RequestException as e:
+        print(f"  ✗ Error importing to VIVO: {e}")
+        return 0
+
+
+def data_update(lines: List[str], operation: str = "INSERT") -> str:
+    """Wrap N-Triples lines in an INSERT/DELETE DATA update on the VIVO content graph."""
+    ntriples_data = "\n".join(lines)
+
+    # VIVO stores user data in the vitro-kb-2 graph
+    return f"""
+    {operation} DATA {{
+        GRAPH <{VIVO_GRAPH}> {{
+            {ntriples_data}
+        }}
+    }}
+    """
+
+
+def import_to_vivo(
+    triples: Union[Graph, Iterable[str]], email: str, password: str, operation: str = "INSERT"
+) -> List[List[str]]:
+    """Import RDF to VIVO in adaptively sized INSERT DATA batches; returns failed batches.
+
+    With operation="DELETE" the same batching sends DELETE DATA updates instead.
+    """
+    if isinstance(triples, Graph):
+        print(f"Importing {len(triples)} triples to VIVO...")
+        # Serialize to N-Triples format (uses full URIs, no prefixes)
+        # This is required for SPARQL INSERT DATA statements
+        chunks = [triples.serialize(format="nt")]
+    else:
+        print(f"Sending {operation} DATA batches to VIVO...")
+        chunks = triples
+
+    batch_size = VIVO_BATCH_TRIPLES
+    max_batch_bytes = VIVO_MAX_BATCH_BYTES
+    failed_batches = []
+    imported = 0
+    rejected = False
+
+    def send(batch: List[str]) -> None:
+        """Send one batch, halving it on 413s and timeouts until the halves go through.
+
+        A batch is only given up on once it is at VIVO_MIN_BATCH_TRIPLES. Other client
+        errors fail the batch without retries, and once VIVO rejects the credentials
+        the remaining batches are not sent at all; only 5xx and connection errors
+        are retried.
+        """
+        nonlocal batch_size, max_batch_bytes, imported, rejected
+        if rejected:
+            failed_batches.append(batch)
+            return
+        for attempt in range(VIVO_MAX_RETRIES):
+            started = time.monotonic()
+            status = post_sparql_update(data_update(batch, operation), email, password)
+            elapsed = time.monotonic() - started
+            if status == 200:
+                imported += len(batch)
+                # Grow batches while VIVO keeps up, shrink them when commits slow down
+                if elapsed < VIVO_TARGET_LATENCY / 2:
+                    batch_size = min(VIVO_MAX_BATCH_TRIPLES, int(batch_size * 1.5))
+                elif elapsed > VIVO_TARGET_LATENCY:
+                    batch_size = max(VIVO_MIN_BATCH_TRIPLES, batch_size // 2)
+                print(f"  Imported {imported} triples ({elapsed:.1f}s, next batch {batch_size})")
+                return
+
+            if status in VIVO_SPLIT_STATUSES:
+                batch_size = max(VIVO_MIN_BATCH_TRIPLES, min(batch_size, len(batch)) // 2)
+                if status == 413:
+                    # Growth only applies to the triple count, so the byte cap keeps
+                    # later batches below the size VIVO just rejected
+                    rejected_bytes = sum(len(line.encode()) for line in batch)
+                    max_batch_bytes = min(max_batch_bytes, rejected_bytes // 2)
+                if len(batch) > VIVO_MIN_BATCH_TRIPLES:
+                    half = len(batch) // 2
+                    print(f"  Splitting batch of {len(batch)} triples (VIVO status {status})")
+                    send(batch[:half])
+                    send(batch[half:])
+                    return
+                if status == 413:
+                    break  # Already at the minimum size; resending cannot succeed
+            elif 400 <= status < 500:
+                if status in (401, 403):
+                    print("✗ VIVO rejected the credentials; not sending the remaining batches")
+                    rejected = True
+                break  # Resending the same request cannot succeed
+            else:
+                batch_size = max(VIVO_MIN_BATCH_TRIPLES, batch_size // 2)
+            if attempt < VIVO_MAX_RETRIES - 1:
+                wait_time = 2 ** (attempt + 1)
+                print(f"  Retrying batch of {len(batch)} triples in {wait_time}s...")
+                retry_sleep(wait_time)
+        failed_batches.append(batch)
+
+    batch, batch_bytes = [], 0
+    for chunk in chunks:
+        for line in chunk.splitlines():
+            if not line.strip():
+                continue
+            batch.append(line)
+            batch_bytes += len(line.encode())
+            if len(batch) >= batch_size or batch_bytes >= max_batch_bytes:
+                send(batch)
+                batch, batch_bytes = [], 0
+    if batch:
+        send(batch)
+
+    if failed_batches:
+        failed_count = sum(len(b) for b in failed_batches)
+        print(f"✗ {len(failed_batches)} batches ({failed_count} triples) failed to import")
+    else:
+        print(f"✓ Successfully sent {imported} triples to VIVO ({operation} DATA)")
+    return failed_batches
+
+
+def open_manifest(path: str) -> sqlite3.Connection:
+    """Open (creating if needed) the delta sync manifest."""
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS publications (
+            pub_uri TEXT PRIMARY KEY, content_hash TEXT, triples TEXT
+        );
+        CREATE TABLE IF NOT EXISTS shared_triples (triple_hash BLOB PRIMARY KEY);
+        """
+    )
+    return conn
+
+
+def split_owned_triples(ntriples: str) -> Tuple[Optional[str], List[str], List[str]]:
+    """Split one paper's N-Triples into its pub URI, owned triples and shared triples."""
+    owned, shared = [], []
+    pub_uri = None
+    for line in ntriples.splitlines():
+        if not line.strip():
+            continue
+        subject = line.split(" ", 1)[0]
+        if any(subject.startswith(f"<{VIVO_BASE}{prefix}") for prefix in OWNED_PREFIXES):
+            owned.append(line)
+            if subject.startswith(f"<{VIVO_BASE}pub-"):
+                pub_uri = subject[1:-1]
         else:
-            print(f"✗ VIVO returned status code {response.status_code}")
-            print(f"Response: {response.text}")
-            return False
+            shared.append(line)
+    return pub_uri, sorted(set(owned)), shared
+
+
+def sync_to_vivo(
+    dois: Iterable[str],
+    email: str,
+    password: str,
+    manifest_path: str = SYNC_MANIFEST,
+    prune: bool = False,
+    workers: int = SCITE_PAPER_WORKERS,
+) -> bool:
+    """Send only added/changed/removed publication triples to VIVO using a hash manifest.
+
+    Missing Scite data never becomes a DELETE: publications whose tallies could not
+    be fetched keep their previous counts, and pruning compares the manifest with
+    the requested DOIs and is skipped if any paper batch failed. Returns False if
+    anything could not be fetched or imported.
+    """
+    conn = open_manifest(manifest_path)
+    deletes, inserts = [], []
+    manifest_updates, seen = {}, set()
+    new_shared = set()
+    stats = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+    tally_predicates = {f"<{prop}>" for prop in TALLY_PROPERTIES.values()}
+    requested, failed_papers = set(), []
+    tally_failures = 0
+    entities = EntityIndex()
+
+    def requested_dois() -> Iterator[str]:
+        for doi in dois:
+            requested.add(str(create_uri("pub-", normalize_doi(doi))))
+            yield doi
+
+    for papers in iter_scite_papers(requested_dois(), workers, failed_papers):
+        papers = [paper for paper in papers if paper.get("doi")]
+        if not papers:
+            continue
+        failed_tallies = []
+        tallies = fetch_tallies([paper["doi"] for paper in papers], failed=failed_tallies)
+        missing_tallies = {normalize_doi(doi) for doi in failed_tallies}
+
+        for paper in papers:
+            doi_key = normalize_doi(paper["doi"])
+            try:
+                ntriples = paper_to_ntriples(paper, tallies.get(doi_key), entities)
+            except Exception as e:
+                print(f"  Warning: Error processing paper {paper.get('doi')}: {e}")
+                continue
+            pub_uri, owned, shared = split_owned_triples(ntriples)
+            if not pub_uri or pub_uri in seen:
+                continue
+            seen.add(pub_uri)
+
+            row = conn.execute(
+                "SELECT content_hash, triples FROM publications WHERE pub_uri = ?", (pub_uri,)
+            ).fetchone()
+            if doi_key in missing_tallies:
+                # Keep the counts VIVO already has instead of deleting them
+                tally_failures += 1
+                old_tallies = [
+                    line
+                    for line in (row[1].splitlines() if row else [])
+                    if line.split(" ", 2)[1] in tally_predicates
+                ]
+                owned = sorted(set(owned).union(old_tallies))
+            content_hash = hashlib.md5("\n".join(owned).encode()).hexdigest()
+
+            if row and row[0] == content_hash:
+                stats["unchanged"] += 1
+            else:
+                old = set(row[1].splitlines()) if row else set()
+                deletes.extend(sorted(old - set(owned)))
+                inserts.extend(line for line in owned if line not in old)
+                manifest_updates[pub_uri] = (content_hash, "\n".join(owned))
+                stats["changed" if row else "added"] += 1
+
+            # Shared people/orgs are only ever inserted, since other publications may use them
+            for line in shared:
+                triple_hash = hashlib.md5(line.encode()).digest()[:8]
+                if triple_hash in new_shared:
+                    continue
+                if not conn.execute(
+                    "SELECT 1 FROM shared_triples WHERE triple_hash = ?", (triple_hash,)
+                ).fetchone():
+                    new_shared.add(triple_hash)
+                    inserts.append(line)
+
+    removed = []
+    if prune and failed_papers:
+        print(f"✗ Not pruning: {len(failed_papers)} DOIs could not be fetched from Scite")
+    elif prune:
+        for pub_uri, triples in conn.execute("SELECT pub_uri, triples FROM publications"):
+            if pub_uri not in requested:
+                removed.append(pub_uri)
+                deletes.extend(triples.splitlines())
+        stats["removed"] = len(removed)
+
+    print(
+        f"Delta: {stats['added']} added, {stats['changed']} changed, "
+        f"{stats['unchanged']} unchanged, {stats['removed']} removed "
+        f"({len(deletes)} triples to delete, {len(inserts)} to insert)"
+    )
 
-    except requests.exceptions.RequestException as e:
-        print(f"✗ Error importing to VIVO: {e}")
+    failed = []
+    if deletes:
+        failed += import_to_vivo(deletes, email, password, operation="DELETE")
+    if inserts and not failed:
+        failed += import_to_vivo(inserts, email, password)
+    if failed:
+        # Leave the manifest untouched; INSERT/DELETE DATA are idempotent, so the
+        # next run simply re-sends the same delta
+        save_failed_batches(failed, backup_filename())
         return False
 
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO publications VALUES (?, ?, ?)",
+            [(uri, h, triples) for uri, (h, triples) in manifest_updates.items()],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO shared_triples VALUES (?)", [(h,) for h in new_shared]
+        )
+        conn.executemany("DELETE FROM publications WHERE pub_uri = ?", [(u,) for u in removed])
+    conn.close()
+    print("✓ Sync manifest updated")
+    if failed_papers or tally_failures:
+        print(
+            f"✗ Could not fetch {len(failed_papers)} papers and the tallies of "
+            f"{tally_failures} publications from Scite; the next sync will retry them"
+        )
+        return False
+    return True
+
+
+async def fetch_stage(dois: Iterable[str], workers: int, out: asyncio.Queue) -> None:
+    """Pipeline stage: push batches of Scite papers onto out."""
+    batches = iter_scite_papers(dois, workers)
+    try:
+        while True:
+            papers = await asyncio.to_thread(next, batches, None)
+            if papers is None:
+                break
+            if papers:
+                await out.put(papers)
+    finally:
+        # Let the later stages drain and finish even if reading the input failed
+        await out.put(None)
+
+
+async def tallies_stage(source: asyncio.Queue, out: asyncio.Queue) -> None:
+    """Pipeline stage: attach Scite tallies to each paper batch."""
+    while (papers := await source.get()) is not None:
+        dois = [paper["doi"] for paper in papers if paper.get("doi")]
+        tallies = await asyncio.to_thread(fetch_tallies, dois)
+        await out.put((papers, tallies))
+    await out.put(None)
+
+
+async def transform_stage(source: asyncio.Queue, out: asyncio.Queue) -> None:
+    """Pipeline stage: convert each paper batch to N-Triples."""
+    entities = EntityIndex()
+
+    def convert(papers: List[Dict], tallies: Dict[str, Dict]) -> str:
+        return papers_to_rdf(papers, tallies, entities=entities).serialize(format="nt")
+
+    while (item := await source.get()) is not None:
+        await out.put(await asyncio.to_thread(convert, *item))
+    await out.put(None)
+
+
+async def import_stage(
+    source: asyncio.Queue, email: str, password: str, output: TextIO = None
+) -> List[List[str]]:
+    """Pipeline stage: write N-Triples to output, or import them to VIVO.
+
+    Every converted batch feeds one import_to_vivo call, so its adaptive batch
+    size and byte limit carry over from one paper batch to the next.
+    """
+    if output is not None:
+        while (ntriples := await source.get()) is not None:
+            await asyncio.to_thread(output.write, ntriples)
+        return []
+
+    loop = asyncio.get_running_loop()
+
+    def converted() -> Iterator[str]:
+        # Runs in the import thread, pulling each batch from the event loop's queue
+        while True:
+            ntriples = asyncio.run_coroutine_threadsafe(source.get(), loop).result()
+            if ntriples is None:
+                return
+            yield ntriples
+
+    return await asyncio.to_thread(import_to_vivo, converted(), email, password)
+
+
+def run_pipeline(
+    dois: Iterable[str],
+    email: str,
+    password: str,
+    workers: int = SCITE_PAPER_WORKERS,
+    output: TextIO = None,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+) -> List[List[str]]:
+    """Fetch papers, fetch tallies, convert and import as concurrent stages.
+
+    Stages are joined by bounded queues, so a slow VIVO stalls conversion and
+    fetching instead of letting fetched papers pile up in memory. Blocking HTTP
+    calls run in worker threads over the pooled sessions. Returns failed batches.
+    """
+
+    async def pipeline() -> List[List[str]]:
+        papers, with_tallies, converted = (asyncio.Queue(queue_size) for _ in range(3))
+        results = await asyncio.gather(
+            fetch_stage(dois, workers, papers),
+            tallies_stage(papers, with_tallies),
+            transform_stage(with_tallies, converted),
+            import_stage(converted, email, password, output),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results[-1]
+
+    return asyncio.run(pipeline())
+
+
+def save_failed_batches(failed_batches: List[List[str]], filename: str) -> None:
+    """Save triples from failed import batches for manual import."""
+    with open(filename, "w", encoding="utf-8") as f:
+        for batch in failed_batches:
+            f.write("\n".join(batch) + "\n")
+    print(f"Failed batches saved to {filename} for manual import")
+
 
 def save_rdf_file(graph: Graph, filename: str) -> None:
     """Save RDF graph to a file."""
@@ -310,20 +1319,317 @@ def save_rdf_file(graph: Graph, filename: str) -> None:
     print(f"✓ Saved RDF to {filename}")
 
 
-def read_dois_from_csv(csv_file: str, column: str = "doi") -> List[str]:
-    """Read DOIs from a CSV file."""
-    dois = []
+def query_vivo_publications(email: str, password: str) -> Dict[str, Dict]:
+    """Return {normalized DOI: {"uri", "tallies"}} for publications already in VIVO."""
+    optionals = "\n".join(
+        f"OPTIONAL {{ ?pub <{prop}> ?{field} }}" for field, prop in TALLY_PROPERTIES.items()
+    )
+    query = f"""
+    SELECT ?pub ?doi {' '.join('?' + field for field in TALLY_PROPERTIES)}
+    WHERE {{
+        GRAPH <{VIVO_GRAPH}> {{
+            ?pub <{BIBO.doi}> ?doi .
+            {optionals}
+        }}
+    }}
+    """
+    response = vivo_session.post(
+        VIVO_SPARQL_QUERY,
+        data={"query": query, "email": email, "password": password},
+        headers={"Accept": "application/sparql-results+json"},
+        timeout=300,
+    )
+    response.raise_for_status()
+
+    publications = {}
+    for binding in response.json()["results"]["bindings"]:
+        publications[normalize_doi(binding["doi"]["value"])] = {
+            "uri": binding["pub"]["value"],
+            "tallies": {
+                field: int(binding[field]["value"])
+                for field in TALLY_PROPERTIES
+                if field in binding
+            },
+        }
+    return publications
+
+
+def tally_update(pub_uri: str, tallies: Dict) -> str:
+    """SPARQL DELETE/INSERT WHERE replacing only the Scite count properties of one publication."""
+    values = ", ".join(f"<{prop}>" for prop in TALLY_PROPERTIES.values())
+    inserts = " ".join(
+        f"<{pub_uri}> <{prop}> {Literal(int(tallies[field]), datatype=XSD.integer).n3()} ."
+        for field, prop in TALLY_PROPERTIES.items()
+        if tallies.get(field) is not None
+    )
+    return f"""
+    DELETE {{ GRAPH <{VIVO_GRAPH}> {{ <{pub_uri}> ?p ?o }} }}
+    INSERT {{ GRAPH <{VIVO_GRAPH}> {{ {inserts} }} }}
+    WHERE {{
+        OPTIONAL {{ GRAPH <{VIVO_GRAPH}> {{ <{pub_uri}> ?p ?o . FILTER(?p IN ({values})) }} }}
+    }}
+    """
+
+
+def refresh_tallies(dois: Optional[List[str]], email: str, password: str) -> bool:
+    """Update Scite counts for publications already in VIVO, touching nothing else.
+
+    Publications whose tallies could not be fetched keep their counts; returns False
+    if any fetch or update failed.
+    """
+    print("Querying VIVO for existing publications...")
     try:
-        with open(csv_file, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
+        publications = query_vivo_publications(email, password)
+    except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+        print(f"✗ Error querying VIVO: {e}")
+        return False
+
+    if dois is not None:
+        wanted = {normalize_doi(doi) for doi in dois}
+        publications = {doi: pub for doi, pub in publications.items() if doi in wanted}
+    print(f"✓ Found {len(publications)} publications in VIVO")
+    if not publications:
+        return True
+
+    unfetched = []
+    tallies = fetch_tallies(list(publications), use_cached=False, failed=unfetched)
+    updates = []
+    for doi, pub in publications.items():
+        new_tallies = tallies.get(doi)
+        if not new_tallies:
+            continue
+        current = {
+            field: new_tallies[field]
+            for field in TALLY_PROPERTIES
+            if new_tallies.get(field) is not None
+        }
+        if current != pub["tallies"]:
+            updates.append(tally_update(pub["uri"], new_tallies))
+    print(f"Updating tallies for {len(updates)} changed publications...")
+
+    failed = 0
+    for start in range(0, len(updates), TALLIES_UPDATE_BATCH):
+        batch = updates[start : start + TALLIES_UPDATE_BATCH]
+        for attempt in range(VIVO_MAX_RETRIES):
+            if post_sparql_update(" ;\n".join(batch), email, password) == 200:
+                break
+            if attempt < VIVO_MAX_RETRIES - 1:
+                retry_sleep(2 ** (attempt + 1))
+        else:
+            failed += len(batch)
+
+    if failed:
+        print(f"✗ Failed to update tallies for {failed} publications")
+    else:
+        print(f"✓ Updated tallies for {len(updates)} publications")
+    if unfetched:
+        # Their counts are left as they are rather than removed
+        print(f"✗ Could not fetch the tallies of {len(unfetched)} publications from Scite")
+    return not failed and not unfetched
+
+
+class RunJournal:
+    """Append-only record of which DOI chunks were fetched, converted and imported."""
+
+    def __init__(self, directory: str, resume: bool = False):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, "journal.jsonl")
+        self.stages = {}
+        if resume and os.path.exists(self.path):
+            for entry in load_jsonl(self.path):
+                self.stages.setdefault(entry["chunk"], set()).add(entry["stage"])
+            print(f"✓ Resuming from journal with {len(self.stages)} chunks in progress")
+        else:
+            self.clear()
+
+    def clear(self) -> None:
+        """Start an empty journal, dropping artifacts left by earlier runs."""
+        for name in os.listdir(self.directory):
+            if name.endswith((".papers.json", ".nt")):
+                os.remove(os.path.join(self.directory, name))
+        open(self.path, "w").close()
+        self.stages = {}
+
+    @staticmethod
+    def chunk_id(dois: List[str]) -> str:
+        return hashlib.md5("\n".join(dois).encode()).hexdigest()
+
+    def done(self, chunk_id: str, stage: str) -> bool:
+        return stage in self.stages.get(chunk_id, ())
+
+    def record(self, chunk_id: str, stage: str, **info) -> None:
+        entry = {"chunk": chunk_id, "stage": stage, "time": datetime.now().isoformat(), **info}
+        append_jsonl(self.path, entry)
+        self.stages.setdefault(chunk_id, set()).add(stage)
+
+    def artifact(self, chunk_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{chunk_id}.{suffix}")
+
+    def discard(self, chunk_id: str, suffix: str) -> None:
+        """Remove an artifact once the stage after it has been recorded."""
+        try:
+            os.remove(self.artifact(chunk_id, suffix))
+        except FileNotFoundError:
+            pass
+
+
+@contextlib.contextmanager
+def stage_timer(timings: Optional[Dict[str, float]], stage: str) -> Iterator[None]:
+    """Add the wall time spent in the block to timings[stage] (no-op without timings)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+def process_chunk(
+    dois: List[str],
+    journal: RunJournal,
+    workers: int,
+    email: str,
+    password: str,
+    output_graph: Graph = None,
+    entities: EntityIndex = None,
+    convert_pool: ProcessPoolExecutor = None,
+    convert_workers: int = 1,
+    timings: Dict[str, float] = None,
+) -> Tuple[int, List[List[str]]]:
+    """Fetch, convert and import (or collect) one DOI chunk, skipping journaled stages.
+
+    entities is shared across chunks so people and orgs described by an earlier
+    chunk are only linked here. With convert_pool, conversion is spread across
+    processes. Seconds spent in the fetch, tallies, convert and import stages are
+    added to timings when given. Returns the chunk's triple count and any import
+    batches that failed.
+    """
+    chunk_id = journal.chunk_id(dois)
+    if output_graph is None and journal.done(chunk_id, "imported"):
+        print("  Already imported, skipping")
+        return 0, []
+
+    if journal.done(chunk_id, "converted"):
+        with stage_timer(timings, "convert"):
+            with open(journal.artifact(chunk_id, "nt"), "r", encoding="utf-8") as f:
+                ntriples = f.read()
+        print("  Loaded converted RDF from journal")
+    else:
+        with stage_timer(timings, "fetch"):
+            if journal.done(chunk_id, "fetched"):
+                with open(journal.artifact(chunk_id, "papers.json"), "r", encoding="utf-8") as f:
+                    papers = json.load(f)
+                print(f"  Loaded {len(papers)} fetched papers from journal")
+            else:
+                papers = [paper for batch in iter_scite_papers(dois, workers) for paper in batch]
+                with open(journal.artifact(chunk_id, "papers.json"), "w", encoding="utf-8") as f:
+                    json.dump(papers, f)
+                journal.record(chunk_id, "fetched", papers=len(papers))
+
+        with stage_timer(timings, "tallies"):
+            dois_fetched = [paper["doi"] for paper in papers if paper.get("doi")]
+            tallies = fetch_tallies(dois_fetched) if dois_fetched else {}
+
+        with stage_timer(timings, "convert"):
+            if not papers:
+                ntriples = ""
+            elif convert_pool is not None:
+                ntriples = papers_to_ntriples_parallel(
+                    papers, convert_pool, convert_workers, entities, tallies
+                )
+            else:
+                graph = papers_to_rdf(papers, tallies, entities=entities)
+                ntriples = graph.serialize(format="nt")
+            with open(journal.artifact(chunk_id, "nt"), "w", encoding="utf-8") as f:
+                f.write(ntriples)
+            journal.record(chunk_id, "converted", triples=ntriples.count("\n"))
+            journal.discard(chunk_id, "papers.json")
+
+    triple_count = ntriples.count("\n")
+    with stage_timer(timings, "import"):
+        if output_graph is not None:
+            output_graph.parse(data=ntriples, format="nt")
+            return triple_count, []
+
+        failed_batches = import_to_vivo([ntriples], email, password) if triple_count else []
+        if not failed_batches:
+            journal.record(chunk_id, "imported", triples=triple_count)
+            journal.discard(chunk_id, "nt")
+    return triple_count, failed_batches
+
+
+def backup_filename() -> str:
+    """Timestamped file name for triples that could not be imported."""
+    # N-Triples is valid Turtle, so the backup keeps the .ttl extension
+    return f"scite_vivo_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ttl"
+
+
+def open_text(path: str) -> TextIO:
+    """Open a file (or '-' for stdin) as text, transparently decompressing .gz."""
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def detect_format(path: str) -> str:
+    """Guess the DOI source format from a file name."""
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lower()
+    return {".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet", ".txt": "txt"}.get(
+        extension, "csv"
+    )
+
+
+def iter_dois(path: str, column: str = "doi", fmt: str = None) -> Iterator[str]:
+    """Stream DOIs from a CSV, JSONL, plain text or Parquet file (gzip and stdin supported)."""
+    fmt = fmt or detect_format(path)
+
+    if fmt == "parquet":
+        if path.endswith(".gz"):
+            raise ValueError("gzipped Parquet is not supported; Parquet compresses its own pages")
+        import pyarrow.parquet as pq  # Optional dependency, only needed for Parquet input
+
+        for record_batch in pq.ParquetFile(path).iter_batches(columns=[column]):
+            for doi in record_batch.column(0).to_pylist():
+                if doi and doi.strip():
+                    yield doi.strip()
+        return
+
+    with open_text(path) as f:
+        if fmt == "csv":
+            reader = csv.reader(f)
+            header = next(reader, [])
+            if column not in header:
+                raise ValueError(f"Column '{column}' not found in {path}")
+            index = header.index(column)
             for row in reader:
-                doi = row.get(column, "").strip()
-                if doi:
-                    dois.append(doi)
-        print(f"✓ Read {len(dois)} DOIs from {csv_file}")
-    except Exception as e:
-        print(f"✗ Error reading CSV: {e}")
-    return dois
+                if len(row) > index and row[index].strip():
+                    yield row[index].strip()
+        elif fmt == "jsonl":
+            for line in f:
+                if line.strip():
+                    doi = json.loads(line).get(column)
+                    if doi and doi.strip():
+                        yield doi.strip()
+        else:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+
+
+class DoiInputError(Exception):
+    """The DOI input could not be read or parsed."""
+
+
+def read_dois(path: str, column: str = "doi", fmt: str = None) -> Iterator[str]:
+    """iter_dois, raising DoiInputError for read and parse errors anywhere in the input."""
+    try:
+        yield from iter_dois(path, column, fmt)
+    except (OSError, UnicodeError, csv.Error, ValueError) as e:
+        raise DoiInputError(f"{path}: {e}") from e
 
 
 def main():
@@ -350,9 +1656,84 @@ Examples:
     )
     parser.add_argument("--dois", nargs="+", help="List of DOIs to import")
     parser.add_argument("--csv", help="CSV file with DOIs (default column: doi)")
-    parser.add_argument("--column", default="doi", help="CSV column name for DOIs")
+    parser.add_argument(
+        "--input",
+        help="Stream DOIs from a CSV, JSONL, TXT or Parquet file, optionally .gz; '-' reads stdin",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "jsonl", "txt", "parquet"],
+        help="Format of --input (default: guessed from the file extension, csv for stdin)",
+    )
+    parser.add_argument("--column", default="doi", help="CSV column / JSON field name for DOIs")
     parser.add_argument("--output", help="Save RDF to file instead of importing to VIVO")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Convert one paper at a time instead of building a graph, writing N-Triples "
+        "to --output (valid Turtle, so .ttl works) or importing them to VIVO in batches",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Run paper fetching, tallies fetching, conversion and import as concurrent "
+        "stages joined by bounded queues (writes N-Triples with --output; not combinable "
+        "with --resume, --sync or --convert-workers)",
+    )
     parser.add_argument("--limit", type=int, help="Limit number of DOIs to process")
+    parser.add_argument(
+        "--bloom-capacity",
+        type=int,
+        help="Deduplicate DOIs with a Bloom filter sized for this many DOIs instead of an "
+        "exact set (bounded memory for very large inputs, ~0.1%% false positives)",
+    )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=SCITE_PAPER_WORKERS,
+        help=f"Concurrent Scite paper batches (default: {SCITE_PAPER_WORKERS})",
+    )
+    parser.add_argument(
+        "--convert-workers",
+        type=int,
+        default=CONVERT_WORKERS,
+        help="Processes used to convert each chunk to RDF; shards are merged and "
+        f"deduplicated before import (default: {CONVERT_WORKERS})",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Bypass the local Scite response cache"
+    )
+    parser.add_argument(
+        "--tallies-only",
+        action="store_true",
+        help="Only refresh Scite citation counts for publications already in VIVO "
+        "(all of them unless --dois/--csv is given)",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Only send publications that were added or changed since the last sync",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=SYNC_MANIFEST,
+        help=f"Delta sync manifest file (default: {SYNC_MANIFEST})",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="With --sync, delete publications in the manifest that are not in this run",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip DOI chunks that a previous run already fetched, converted or imported",
+    )
+    parser.add_argument(
+        "--journal-dir",
+        default=RUN_JOURNAL_DIR,
+        help=f"Directory for the run journal used by --resume (default: {RUN_JOURNAL_DIR})",
+    )
     parser.add_argument(
         "--email", default=VIVO_EMAIL, help=f"VIVO admin email (default: {VIVO_EMAIL})"
     )
@@ -360,6 +1741,9 @@ Examples:
 
     args = parser.parse_args()
 
+    if not args.no_cache:
+        open_scite_cache()
+
     # Use password from args, fallback to env var
     password = args.password or VIVO_PASSWORD
 
@@ -371,51 +1755,148 @@ Examples:
         )
         sys.exit(1)
 
+    if args.pipeline:
+        # The pipeline converts in-process and keeps no journal or manifest
+        for flag, used in (
+            ("--resume", args.resume),
+            ("--sync", args.sync),
+            ("--convert-workers above 1", args.convert_workers > 1),
+        ):
+            if used:
+                print(f"Error: --pipeline cannot be combined with {flag}")
+                sys.exit(1)
+
     # Get DOIs
     dois = []
     if args.dois:
         dois = args.dois
-    elif args.csv:
-        dois = read_dois_from_csv(args.csv, args.column)
+    elif args.csv or args.input:
+        # DOIs are streamed and only pulled as the fetch stage needs them
+        dois = read_dois(args.input or args.csv, args.column, args.format)
+    elif args.tallies_only:
+        dois = None
     else:
-        print("Error: Must provide --dois or --csv")
+        print("Error: Must provide --dois, --csv or --input")
         sys.exit(1)
 
-    if args.limit:
-        dois = dois[: args.limit]
+    if args.tallies_only:
+        if args.output:
+            print("Error: --tallies-only updates VIVO and cannot be combined with --output")
+            sys.exit(1)
+        if not refresh_tallies(dois, args.email, password):
+            sys.exit(1)
+        print("\n✓ Tallies refresh complete!")
+        return
 
-    if not dois:
-        print("Error: No DOIs to process")
-        sys.exit(1)
+    # Normalize and deduplicate before anything is fetched
+    dois = iter_unique_dois(dois, args.bloom_capacity)
 
-    # Query Scite API
-    papers = query_scite_papers(dois)
+    if args.limit:
+        dois = itertools.islice(dois, args.limit)
 
-    if not papers:
-        print("No papers retrieved from Scite API")
+    first_doi = next(iter(dois), None)
+    if first_doi is None:
+        print("Error: No DOIs to process")
         sys.exit(1)
+    dois = itertools.chain([first_doi], dois)
 
-    # Convert to RDF
-    graph = papers_to_rdf(papers)
+    if args.sync:
+        if args.output:
+            print("Error: --sync imports to VIVO and cannot be combined with --output")
+            sys.exit(1)
+        if not sync_to_vivo(
+            dois, args.email, password, args.manifest, args.prune, args.fetch_workers
+        ):
+            sys.exit(1)
+        print("\n✓ Sync complete!")
+        return
+
+    if args.pipeline:
+        if args.output:
+            print(f"Pipelining RDF to {args.output}...")
+            with open(args.output, "w", encoding="utf-8") as out:
+                run_pipeline(dois, args.email, password, args.fetch_workers, out)
+        else:
+            failed_batches = run_pipeline(dois, args.email, password, args.fetch_workers)
+            if failed_batches:
+                save_failed_batches(failed_batches, backup_filename())
+                sys.exit(1)
+        print_uri_cache_stats()
+        print("\n✓ Import complete!")
+        return
+
+    if args.stream:
+        paper_batches = iter_scite_papers(dois, args.fetch_workers)
+        if args.output:
+            print(f"Streaming RDF to {args.output}...")
+            with open(args.output, "w", encoding="utf-8") as out:
+                if not stream_rdf(paper_batches, out):
+                    print("Error: No RDF generated")
+                    sys.exit(1)
+        else:
+            failed_batches = import_to_vivo(
+                iter_paper_ntriples(paper_batches), args.email, password
+            )
+            if failed_batches:
+                save_failed_batches(failed_batches, backup_filename())
+                sys.exit(1)
+        print_uri_cache_stats()
+        print("\n✓ Import complete!")
+        return
+
+    # Process DOIs in journaled chunks so a crashed run can be resumed
+    journal = RunJournal(args.journal_dir, resume=args.resume)
+    output_graph = new_graph() if args.output else None
+    entities = EntityIndex()
+    convert_pool = new_convert_pool(args.convert_workers) if args.convert_workers > 1 else None
+    total_triples = 0
+    failed_batches = []
+    try:
+        for idx, chunk in enumerate(iter_batches(dois, RUN_CHUNK_SIZE), 1):
+            print(f"\nChunk {idx} ({len(chunk)} DOIs)")
+            triple_count, chunk_failed = process_chunk(
+                chunk,
+                journal,
+                args.fetch_workers,
+                args.email,
+                password,
+                output_graph,
+                entities,
+                convert_pool,
+                args.convert_workers,
+            )
+            total_triples += triple_count
+            failed_batches += chunk_failed
+    finally:
+        if convert_pool is not None:
+            convert_pool.shutdown()
 
-    if len(graph) == 0:
+    if output_graph is not None and len(output_graph) == 0:
         print("Error: No RDF generated")
         sys.exit(1)
 
-    # Save to file or import to VIVO
+    # Save to file, or keep only the batches VIVO rejected as backup
     if args.output:
-        save_rdf_file(graph, args.output)
-    else:
-        success = import_to_vivo(graph, args.email, password)
-        if not success:
-            # Save to file as backup
-            backup_file = f"scite_vivo_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ttl"
-            save_rdf_file(graph, backup_file)
-            print(f"Data saved to {backup_file} for manual import")
-            sys.exit(1)
+        save_rdf_file(output_graph, args.output)
+        # The chunks only live in output_graph until here, so their artifacts were kept
+        # for --resume; the file is written now and nothing is left to resume
+        journal.clear()
+    elif failed_batches:
+        save_failed_batches(failed_batches, backup_filename())
+        print("Re-run with --resume to retry the failed chunks")
+        sys.exit(1)
+    elif not total_triples and not args.resume:
+        print("Error: No RDF generated")
+        sys.exit(1)
 
+    print_uri_cache_stats()
     print("\n✓ Import complete!")
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except DoiInputError as e:
+        # Raised wherever the lazy input is consumed, which may be well into the run
+        print(f"✗ Error reading DOIs: {e}")
+        sys.exit(1)
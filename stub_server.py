@@ -0,0 +1,73 @@
+"""
+Server scaffolding shared by the local stand-ins
+
+scite_stub.py, vivo_stub.py and posthog_stub.py build on StubServer and
+StubHandler, run in-process (benchmarks, tests) with start_server() and in the
+foreground with serve_until_stopped().
+"""
+
+import signal
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded HTTP server with thread-safe request counters."""
+
+    daemon_threads = True
+
+    def __init__(self, address, handler_class):
+        super().__init__(address, handler_class)
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key: str, amount: int = 1) -> None:
+        with self.lock:
+            self.stats[key] += amount
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Keep-alive handler that stays quiet and counts the bytes it sends."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, status: int, data: bytes, content_type: str, headers: Dict = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.count("bytes_sent", len(data))
+
+
+def start_server(server: StubServer) -> threading.Thread:
+    """Serve in a daemon thread (for benchmarks and tests); stop with server.shutdown()."""
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def stop(signum, frame):
+    """Let SIGTERM shut down as cleanly as Ctrl-C."""
+    raise KeyboardInterrupt
+
+
+def serve_until_stopped(server: StubServer) -> None:
+    """Serve in the foreground until Ctrl-C or SIGTERM."""
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
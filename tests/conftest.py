@@ -0,0 +1,107 @@
+"""
+Shared fixtures: the scripts pointed at in-process Scite, VIVO and PostHog stand-ins
+
+The scripts live at the repository root, so it is put on sys.path here. The
+local Scite cache is switched off before scite_to_vivo is first imported, so
+tests never read or write ~/.cache. account_monitor_enhanced.py does its work
+at import time, so it is run as a subprocess against the PostHog stand-in.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["SCITE_CACHE"] = "0"
+
+import scite_to_vivo as stv  # noqa: E402
+from posthog_stub import PostHogStubServer, open_database  # noqa: E402
+from scite_stub import SciteStubServer, SyntheticCorpus, synthetic_dois  # noqa: E402
+from stub_server import start_server  # noqa: E402
+from vivo_stub import QUERY_PATH, UPDATE_PATH, VivoStubServer  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    """Skip the retry backoff sleeps in scite_to_vivo."""
+    monkeypatch.setattr(stv, "retry_sleep", lambda seconds: None)
+    monkeypatch.setattr(stv, "_batch_tallies_supported", True)
+
+
+@pytest.fixture
+def vivo(monkeypatch):
+    """Start a VIVO stand-in and point scite_to_vivo at it."""
+    server = VivoStubServer(("127.0.0.1", 0))
+    start_server(server)
+    monkeypatch.setattr(stv, "VIVO_SPARQL_UPDATE", server.url + UPDATE_PATH)
+    monkeypatch.setattr(stv, "VIVO_SPARQL_QUERY", server.url + QUERY_PATH)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def scite(monkeypatch):
+    """Start a Scite stand-in over a small synthetic corpus and point scite_to_vivo at it."""
+    server = SciteStubServer(("127.0.0.1", 0), SyntheticCorpus(seed=1, authors_max=3))
+    start_server(server)
+    monkeypatch.setattr(stv, "SCITE_API_URL", server.url)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def dois():
+    return list(synthetic_dois(20))
+
+
+@pytest.fixture
+def posthog():
+    """Start a PostHog stand-in with 180 days of events from 10 synthetic companies."""
+    data = argparse.Namespace(
+        companies=10, days=180, users_min=2, users_max=5, events_per_user_day=1.0, seed=0,
+        regenerate=False,
+    )
+    server = PostHogStubServer(("127.0.0.1", 0), open_database(":memory:", data))
+    start_server(server)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def run_monitor(posthog, tmp_path):
+    """Run account_monitor_enhanced.py against the PostHog stand-in and return its output.
+
+    Keyword arguments override environment variables. All state files live in tmp_path.
+    """
+    env = {
+        **os.environ,
+        "POSTHOG_HOST": posthog.url,
+        "POSTHOG_QUERY_RATE": "1000",
+        "COMPANY_LIMIT": "10",
+        "HOGQL_CACHE": "0",
+        "HOGQL_CACHE_PATH": str(tmp_path / "hogql_cache.sqlite"),
+        "ROLLUP_PATH": str(tmp_path / "rollup.sqlite"),
+        "MONITOR_CHECKPOINT": str(tmp_path / "checkpoint.jsonl"),
+        "MONITOR_METRICS_JSON": str(tmp_path / "metrics.json"),
+        "MONITOR_METRICS_PROM": str(tmp_path / "metrics.prom"),
+    }
+
+    def run(**overrides):
+        # Exits non-zero past Step 2 without openpyxl; everything tested happens before
+        return subprocess.run(
+            [sys.executable, os.path.join(ROOT, "account_monitor_enhanced.py")],
+            env={**env, **overrides},
+            cwd=str(tmp_path),
+            capture_output=True,
+            text=True,
+            timeout=300,
+        ).stdout
+
+    return run
@@ -0,0 +1,115 @@
+"""account_monitor_enhanced.py end to end against the PostHog stand-in"""
+
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from posthog_stub import AG_PROJECT_ID
+
+
+def rollup_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {
+            table: sorted(conn.execute(f"SELECT * FROM {table}"))
+            for table in ("daily_events", "daily_users", "synced_days")
+        }
+    finally:
+        conn.close()
+
+
+def query_metrics(path):
+    return json.loads(path.read_text())["projects"]
+
+
+def summary(output):
+    return output.split("Results:")[1].split("Step 3")[0]
+
+
+def test_rollup_pulls_missing_days_then_refreshes_recent_ones(posthog, run_monitor, tmp_path):
+    output = run_monitor(ANALYSIS_MODE="rollup")
+    assert "pulling 180 from PostHog" in output
+    yesterday = (datetime.now(timezone.utc).date() - timedelta(days=1)).isoformat()
+    before = sum(row[3] for row in rollup_rows(tmp_path / "rollup.sqlite")["daily_events"]
+                 if row[1] == yesterday)
+
+    # An event for yesterday that PostHog only ingested after the first run
+    table = f"events_{AG_PROJECT_ID}"
+    with posthog.db_lock:
+        event, _, distinct_id, properties, person = posthog.conn.execute(
+            f"SELECT * FROM {table} LIMIT 1"
+        ).fetchone()
+        midday = datetime.fromisoformat(f"{yesterday}T12:00:00+00:00").timestamp()
+        posthog.conn.execute(
+            f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?)",
+            (event, midday, distinct_id, properties, person),
+        )
+
+    output = run_monitor(ANALYSIS_MODE="rollup")
+
+    assert "pulling 2 from PostHog" in output
+    after = sum(row[3] for row in rollup_rows(tmp_path / "rollup.sqlite")["daily_events"]
+                if row[1] == yesterday)
+    assert after == before + 1
+
+
+def test_rollup_paging_stores_the_same_days(run_monitor, tmp_path):
+    run_monitor(ANALYSIS_MODE="rollup")
+    full = rollup_rows(tmp_path / "rollup.sqlite")
+    (tmp_path / "rollup.sqlite").unlink()
+
+    output = run_monitor(ANALYSIS_MODE="rollup", ROLLUP_PAGE_SIZE="10")
+
+    assert "Paged" in output
+    assert rollup_rows(tmp_path / "rollup.sqlite") == full
+
+
+def test_grouped_runtime_estimate_counts_company_batches(run_monitor):
+    output = run_monitor(GROUPED_BATCH_SIZE="4")
+
+    assert "Estimated Step 2 runtime" in output
+    assert "(3 HogQL queries at 1000/s, grouped analysis)" in output
+    assert "Running grouped queries" in output
+
+
+def test_rate_limiter_keeps_below_the_project_rate(posthog, run_monitor, tmp_path):
+    posthog.rate = 5
+    output = run_monitor(GROUPED_BATCH_SIZE="1", POSTHOG_QUERY_RATE="4", POSTHOG_QUERY_BURST="1")
+
+    assert "Running grouped queries" in output
+    assert posthog.stats["throttled"] == 0
+    assert query_metrics(tmp_path / "metrics.json")[str(AG_PROJECT_ID)]["queries"] > 5
+
+
+def test_throttled_queries_back_off_and_complete(posthog, run_monitor, tmp_path):
+    posthog.rate = 5
+    output = run_monitor(GROUPED_BATCH_SIZE="1", POSTHOG_QUERY_BURST="10")
+
+    assert "Rate limit, waiting" in output
+    assert "Max retries exceeded" not in output
+    assert "Grouped query failed" not in output
+    projects = query_metrics(tmp_path / "metrics.json")
+    assert sum(p["rate_limited"] for p in projects.values()) == posthog.stats["throttled"] > 0
+
+
+def test_hogql_cache_answers_a_rerun_without_posthog(posthog, run_monitor, tmp_path):
+    first = run_monitor(HOGQL_CACHE="1")
+    sent = posthog.stats["queries"]
+
+    second = run_monitor(HOGQL_CACHE="1")
+
+    assert posthog.stats["queries"] == sent
+    projects = query_metrics(tmp_path / "metrics.json")
+    assert all(p["cache_hits"] == p["queries"] for p in projects.values())
+    assert summary(second) == summary(first)
+
+
+def test_hogql_cache_stays_within_its_size_budget(run_monitor, tmp_path):
+    run_monitor(HOGQL_CACHE="1", HOGQL_CACHE_MAX_MB="0.001")
+
+    conn = sqlite3.connect(tmp_path / "hogql_cache.sqlite")
+    try:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM hogql_cache").fetchone()[0]
+    finally:
+        conn.close()
+    assert total <= 1024 * 1024 * 0.001
@@ -0,0 +1,115 @@
+"""Crash-safe JSONL logs and the account monitor's checkpoint resume"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import pytest
+
+from jsonl_log import append_jsonl, load_jsonl
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_torn_final_line_is_skipped_and_terminated(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    append_jsonl(path, {"n": 1})
+    append_jsonl(path, {"n": 2})
+    with open(path, "a") as f:
+        f.write('{"n": 3')
+
+    assert load_jsonl(path) == [{"n": 1}, {"n": 2}]
+    append_jsonl(path, {"n": 4})
+    assert load_jsonl(path) == [{"n": 1}, {"n": 2}, {"n": 4}]
+
+
+def test_encoder_and_object_hook_are_applied(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    when = datetime(2026, 1, 2, 3, 4, 5)
+    append_jsonl(path, {"when": when}, default=lambda value: {"__datetime__": value.isoformat()})
+
+    def hook(obj):
+        return datetime.fromisoformat(obj["__datetime__"]) if "__datetime__" in obj else obj
+
+    assert load_jsonl(path, object_hook=hook) == [{"when": when}]
+
+
+def test_empty_log_loads_nothing(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.touch()
+    assert load_jsonl(str(path)) == []
+    assert path.read_bytes() == b""
+
+
+@pytest.fixture
+def posthog():
+    """Run posthog_stub.py on a free port and return its URL."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    command = [sys.executable, os.path.join(ROOT, "posthog_stub.py"), "--port", str(port)]
+    stub = subprocess.Popen(
+        command + ["--companies", "10"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            if stub.poll() is not None or time.monotonic() > deadline:
+                stub.kill()
+                pytest.fail("posthog_stub.py did not start")
+            time.sleep(0.1)
+    yield f"http://127.0.0.1:{port}"
+    stub.terminate()
+    stub.wait()
+
+
+def test_monitor_resumes_from_torn_checkpoint(posthog, tmp_path):
+    pytest.importorskip("pandas")
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    env = {
+        **os.environ,
+        "POSTHOG_HOST": posthog,
+        "POSTHOG_QUERY_RATE": "1000",
+        "HOGQL_CACHE": "0",
+        "COMPANY_LIMIT": "10",
+        "ROLLUP_PATH": str(tmp_path / "rollup.sqlite"),
+        "MONITOR_CHECKPOINT": checkpoint,
+        "MONITOR_METRICS_JSON": str(tmp_path / "metrics.json"),
+        "MONITOR_METRICS_PROM": str(tmp_path / "metrics.prom"),
+    }
+
+    def run_monitor(**extra):
+        # Exits non-zero past Step 2 without openpyxl; the checkpoint is written by then
+        return subprocess.run(
+            [sys.executable, os.path.join(ROOT, "account_monitor_enhanced.py")],
+            env={**env, **extra},
+            cwd=str(tmp_path),
+            capture_output=True,
+            text=True,
+            timeout=300,
+        ).stdout
+
+    run_monitor()
+    with open(checkpoint) as f:
+        lines = f.readlines()
+    results = len(lines) - 1
+    assert results > 1 and '"companies"' in lines[0]
+
+    # Lose the last finished company and leave a torn line, as a crash mid-write would
+    with open(checkpoint, "w") as f:
+        f.writelines(lines[:-1])
+        f.write(lines[-1][:20])
+
+    output = run_monitor(MONITOR_RESUME="1")
+
+    assert f"{results - 1} companies restored from checkpoint, 1 remaining" in output
+    entries = load_jsonl(checkpoint)
+    assert len(entries) == results + 1
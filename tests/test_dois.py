@@ -0,0 +1,90 @@
+"""DOI normalization and deduplication before anything is fetched"""
+
+import copy
+import gzip
+import os
+import subprocess
+import sys
+
+import pytest
+
+import scite_to_vivo as stv
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "10.1000/ABC.123",
+        "  10.1000/abc.123 ",
+        "https://doi.org/10.1000/abc.123",
+        "http://dx.doi.org/10.1000/ABC.123",
+        "https://www.doi.org/10.1000%2Fabc.123",
+        "doi: 10.1000/abc.123",
+        "DOI:10.1000/abc.123",
+    ],
+)
+def test_normalize_doi(raw):
+    assert stv.normalize_doi(raw) == "10.1000/abc.123"
+
+
+def test_bare_doi_is_not_url_decoded():
+    assert stv.normalize_doi("10.1000/a%2Fb") == "10.1000/a%2fb"
+
+
+def test_bloom_filter_reports_repeats():
+    bloom = stv.BloomFilter(1000)
+    items = [f"10.1000/{i}" for i in range(1000)]
+    false_positives = sum(bloom.add(item) for item in items)
+    assert all(bloom.add(item) for item in items)
+    # Probe copies so the filter is never filled past its capacity
+    false_positives += sum(copy.deepcopy(bloom).add(f"10.2000/{i}") for i in range(1000))
+    assert false_positives < 10
+
+
+@pytest.mark.parametrize("bloom_capacity", [None, 100])
+def test_iter_unique_dois(bloom_capacity):
+    dois = ["10.1/a", "https://doi.org/10.1/A", "not a doi", "", "10.1/b", "doi:10.1/b"]
+    assert list(stv.iter_unique_dois(dois, bloom_capacity)) == ["10.1/a", "10.1/b"]
+
+
+def test_read_errors_after_the_first_doi_are_raised(tmp_path):
+    path = tmp_path / "dois.txt"
+    # Well past the first read buffer, so the bad byte is only decoded mid-stream
+    path.write_bytes(b"".join(b"10.1/%d\n" % i for i in range(10000)) + b"\xff\n")
+    dois = stv.read_dois(str(path))
+
+    assert next(dois) == "10.1/0"
+    with pytest.raises(stv.DoiInputError):
+        list(dois)
+
+
+def test_gzipped_parquet_is_rejected(tmp_path):
+    path = tmp_path / "dois.parquet.gz"
+    with gzip.open(path, "wb") as f:
+        f.write(b"PAR1")
+
+    with pytest.raises(stv.DoiInputError, match="gzipped Parquet"):
+        list(stv.read_dois(str(path)))
+
+
+def test_pipeline_stops_on_unreadable_input(scite, vivo, dois):
+    def unreadable():
+        yield from dois
+        raise stv.DoiInputError("dois.txt: invalid start byte")
+
+    with pytest.raises(stv.DoiInputError):
+        stv.run_pipeline(unreadable(), "", "")
+
+
+def test_tallies_only_reports_unreadable_stdin(vivo):
+    result = subprocess.run(
+        [sys.executable, stv.__file__, "--tallies-only", "--input", "-", "--format", "txt"],
+        input=b"10.1/a\n\xff\n",
+        env={**os.environ, "VIVO_BASE_URL": vivo.url, "VIVO_PASSWORD": "secret"},
+        capture_output=True,
+        timeout=60,
+    )
+
+    assert result.returncode == 1
+    assert "✗ Error reading DOIs" in result.stdout.decode()
+    assert b"Traceback" not in result.stderr
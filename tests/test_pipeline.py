@@ -0,0 +1,35 @@
+"""Concurrent fetch/tallies/convert/import pipeline"""
+
+import io
+
+import scite_to_vivo as stv
+
+
+def test_pipeline_imports_through_one_adaptive_import(scite, vivo, dois, monkeypatch):
+    monkeypatch.setattr(stv, "SCITE_BATCH_SIZE", 5)
+    imports = []
+    import_to_vivo = stv.import_to_vivo
+
+    def counting_import(*args, **kwargs):
+        imports.append(args)
+        return import_to_vivo(*args, **kwargs)
+
+    monkeypatch.setattr(stv, "import_to_vivo", counting_import)
+
+    assert stv.run_pipeline(dois, "", "", workers=2) == []
+
+    assert len(imports) == 1
+    assert vivo.snapshot()["triples"] > 0
+    with vivo.store_lock:
+        pubs = set(vivo.dataset.subjects(stv.BIBO.doi, None))
+    assert len(pubs) == len(dois)
+
+
+def test_pipeline_writes_output(scite, dois, monkeypatch):
+    monkeypatch.setattr(stv, "SCITE_BATCH_SIZE", 5)
+    out = io.StringIO()
+
+    assert stv.run_pipeline(dois, "", "", workers=2, output=out) == []
+
+    dois_written = {line.split('"')[1] for line in out.getvalue().splitlines() if "/doi>" in line}
+    assert dois_written == set(dois)
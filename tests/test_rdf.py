@@ -0,0 +1,89 @@
+"""RDF conversion: the cross-paper entity index, what it may skip and the parallel merge"""
+
+import pytest
+
+import scite_to_vivo as stv
+
+
+@pytest.fixture(scope="module")
+def convert_pool():
+    pool = stv.new_convert_pool(2)
+    yield pool
+    pool.shutdown()
+
+
+def paper(doi, authors):
+    return {"doi": doi, "title": f"Paper {doi}", "authors": authors}
+
+
+def orcids(ntriples):
+    return sorted(
+        line.split(" ", 2)[2].split('"')[1]
+        for line in ntriples.splitlines()
+        if f"<{stv.VIVO.orcidId}>" in line
+    )
+
+
+def test_orcid_from_a_later_occurrence_is_kept(scite):
+    papers = [
+        paper("10.1/a", [{"authorName": "Ada Lovelace"}]),
+        paper("10.1/b", [{"authorName": "Ada Lovelace", "orcid": "0000-0001"}]),
+    ]
+    ntriples = "".join(stv.iter_paper_ntriples([papers]))
+    assert orcids(ntriples) == ["0000-0001"]
+
+
+def test_known_entities_are_only_linked(scite):
+    author = {"authorName": "Ada Lovelace", "affiliation": "Analytical Society"}
+    entities = stv.EntityIndex()
+    first, second = stv.iter_paper_ntriples(
+        [[paper("10.1/a", [author]), paper("10.1/b", [author])]], entities
+    )
+    person = f"<{stv.create_uri('person-', 'Ada Lovelace')}>"
+
+    assert any(line.startswith(person) for line in first.splitlines())
+    assert not any(line.startswith(person) for line in second.splitlines())
+    assert entities.reused == 3  # person, organization and position
+
+
+def test_entity_index_is_bounded():
+    entities = stv.EntityIndex(max_size=2)
+    assert entities.first_time("a") and entities.first_time("b")
+    assert not entities.first_time("a")
+    assert entities.first_time("c")
+
+    assert len(entities.uris) == 2
+    assert "a" in entities and "b" not in entities
+
+
+def test_parallel_conversion_matches_serial(scite, dois, convert_pool):
+    papers = [scite.corpus.paper(doi) for doi in dois]
+    tallies = stv.fetch_tallies(dois)
+
+    serial = stv.papers_to_rdf(papers, tallies, entities=stv.EntityIndex()).serialize(format="nt")
+    parallel = stv.papers_to_ntriples_parallel(papers, convert_pool, 2, stv.EntityIndex(), tallies)
+
+    assert set(parallel.splitlines()) == set(serial.splitlines())
+    assert len(parallel.splitlines()) == len(set(parallel.splitlines()))
+
+
+def test_parallel_merge_describes_shared_entities_once(convert_pool):
+    ada = {"authorName": "Ada Lovelace", "affiliation": "Analytical Society"}
+    person = f"<{stv.create_uri('person-', 'Ada Lovelace')}>"
+    entities = stv.EntityIndex()
+
+    # One paper per shard, so both workers describe the same person
+    first = stv.papers_to_ntriples_parallel(
+        [paper("10.1/a", [ada]), paper("10.1/b", [{**ada, "orcid": "0000-0001"}])],
+        convert_pool, 2, entities, {},
+    )
+    label = f"{person} <{stv.RDFS.label}>"
+    assert sum(line.startswith(label) for line in first.splitlines()) == 1
+    assert orcids(first) == ["0000-0001"]
+
+    second = stv.papers_to_ntriples_parallel(
+        [paper("10.1/c", [{**ada, "orcid": "0000-0002"}])], convert_pool, 2, entities, {}
+    )
+    assert [line for line in second.splitlines() if line.startswith(person)] == [
+        f'{person} <{stv.VIVO.orcidId}> "0000-0002" .'
+    ]
@@ -0,0 +1,81 @@
+"""Resumable runs: the chunk journal and the artifacts process_chunk keeps between stages"""
+
+import os
+
+import pytest
+from rdflib import Graph
+
+import scite_to_vivo as stv
+
+
+@pytest.fixture
+def journal_dir(tmp_path):
+    return str(tmp_path / "journal")
+
+
+def test_resume_skips_torn_final_line(journal_dir):
+    journal = stv.RunJournal(journal_dir)
+    journal.record("a", "fetched")
+    journal.record("a", "converted")
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"chunk": "b", "sta')
+
+    journal = stv.RunJournal(journal_dir, resume=True)
+    assert journal.stages == {"a": {"fetched", "converted"}}
+    journal.record("b", "fetched")
+
+    assert stv.RunJournal(journal_dir, resume=True).stages == {
+        "a": {"fetched", "converted"},
+        "b": {"fetched"},
+    }
+
+
+def test_without_resume_starts_clean(journal_dir):
+    journal = stv.RunJournal(journal_dir)
+    journal.record("a", "converted")
+    for suffix in ("papers.json", "nt"):
+        with open(journal.artifact("a", suffix), "w") as f:
+            f.write("left over")
+
+    journal = stv.RunJournal(journal_dir)
+
+    assert journal.stages == {}
+    assert os.listdir(journal_dir) == ["journal.jsonl"]
+    assert os.path.getsize(journal.path) == 0
+
+
+def test_failed_import_resumes_from_converted_rdf(scite, vivo, dois, journal_dir):
+    journal = stv.RunJournal(journal_dir)
+    chunk_id = journal.chunk_id(dois)
+    vivo.fail_every = 1
+
+    triples, failed = stv.process_chunk(dois, journal, 2, "", "")
+
+    assert triples > 0 and failed
+    assert not journal.done(chunk_id, "imported")
+    assert os.path.exists(journal.artifact(chunk_id, "nt"))
+    assert not os.path.exists(journal.artifact(chunk_id, "papers.json"))
+
+    vivo.fail_every = 0
+    papers_requests = scite.stats["papers_requests"]
+    journal = stv.RunJournal(journal_dir, resume=True)
+
+    assert stv.process_chunk(dois, journal, 2, "", "") == (triples, [])
+    assert scite.stats["papers_requests"] == papers_requests
+    assert vivo.snapshot()["triples"] == triples
+    assert os.listdir(journal_dir) == ["journal.jsonl"]
+
+    journal = stv.RunJournal(journal_dir, resume=True)
+    requests = vivo.snapshot()["update_requests"]
+    assert stv.process_chunk(dois, journal, 2, "", "") == (0, [])
+    assert vivo.snapshot()["update_requests"] == requests
+
+
+def test_output_graph_collects_triples(scite, dois, journal_dir):
+    journal = stv.RunJournal(journal_dir)
+    graph = Graph()
+
+    triples, failed = stv.process_chunk(dois, journal, 2, "", "", output_graph=graph)
+
+    assert failed == []
+    assert len(graph) == triples
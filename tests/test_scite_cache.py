@@ -0,0 +1,90 @@
+"""Local Scite response cache: batched lookups, TTLs, LRU eviction and ETag revalidation"""
+
+import time
+
+import pytest
+
+import scite_to_vivo as stv
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = stv.SciteCache(str(tmp_path / "cache.sqlite"), max_entries=1000)
+    monkeypatch.setattr(stv, "scite_cache", cache)
+    return cache
+
+
+def test_lookups_use_normalized_dois(cache):
+    cache.put("paper", {"10.1/ABC": {"title": "A"}})
+    assert cache.get("paper", "https://doi.org/10.1/abc")[0] == {"title": "A"}
+    assert cache.get("tallies", "10.1/abc") is None
+
+
+def test_get_many_spans_lookup_chunks(cache, monkeypatch):
+    monkeypatch.setattr(stv, "CACHE_LOOKUP_CHUNK", 7)
+    cache.put("paper", {f"10.1/{i}": {"n": i} for i in range(50)})
+    dois = [f"10.1/{i}" for i in range(0, 60, 2)]
+
+    entries = cache.get_many("paper", dois)
+
+    assert {doi: entry[0]["n"] for doi, entry in entries.items()} == {
+        f"10.1/{i}": i for i in range(0, 50, 2)
+    }
+
+
+def test_get_fresh_honours_ttl(tmp_path):
+    now = [time.time()]
+    cache = stv.SciteCache(str(tmp_path / "cache.sqlite"), max_entries=1000, clock=lambda: now[0])
+    cache.put("tallies", {"10.1/old": {"total": 1}})
+    now[0] += 120
+    cache.put("tallies", {"10.1/new": {"total": 2}})
+
+    assert cache.get_fresh("tallies", ["10.1/old", "10.1/new"], ttl=60) == {
+        "10.1/new": {"total": 2}
+    }
+    assert cache.get("tallies", "10.1/old")[2] >= 120
+
+
+def test_put_evicts_least_recently_used(tmp_path):
+    clock = iter(range(1000, 2000))
+    cache = stv.SciteCache(str(tmp_path / "cache.sqlite"), max_entries=3, clock=lambda: next(clock))
+    for doi in ("10.1/a", "10.1/b", "10.1/c"):
+        cache.put("paper", {doi: {}})
+    cache.get("paper", "10.1/a")
+
+    cache.put("paper", {"10.1/d": {}})
+
+    assert set(cache.get_many("paper", ["10.1/a", "10.1/b", "10.1/c", "10.1/d"])) == {
+        "10.1/a", "10.1/c", "10.1/d"
+    }
+
+
+def test_fetch_tallies_serves_fresh_entries_from_cache(scite, cache, dois):
+    first = stv.fetch_tallies(dois)
+    requests = dict(scite.stats)
+
+    assert stv.fetch_tallies(dois) == first
+    assert dict(scite.stats) == requests
+
+
+def test_expired_tallies_are_revalidated_with_etags(scite, cache, dois, monkeypatch):
+    scite.batch_tallies = False
+    first = stv.fetch_tallies(dois)
+    assert scite.stats["tally_requests"] == len(dois)
+
+    monkeypatch.setattr(stv, "SCITE_TALLIES_TTL", 0)
+    assert stv.fetch_tallies(dois) == first
+    assert scite.stats["not_modified"] == len(dois)
+
+
+def test_cache_is_only_opened_on_request(tmp_path, monkeypatch):
+    path = tmp_path / "cache" / "scite.sqlite"
+    monkeypatch.setattr(stv, "SCITE_CACHE", True)
+    monkeypatch.setattr(stv, "SCITE_CACHE_PATH", str(path))
+    monkeypatch.setattr(stv, "scite_cache", None)
+    assert not path.exists()
+
+    stv.open_scite_cache()
+
+    assert isinstance(stv.scite_cache, stv.SciteCache)
+    assert path.exists()
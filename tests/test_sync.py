@@ -0,0 +1,143 @@
+"""Delta sync: only added, changed and removed publication triples reach VIVO"""
+
+import sqlite3
+
+import pytest
+
+import scite_to_vivo as stv
+
+
+@pytest.fixture
+def papers(scite, dois):
+    return [scite.corpus.paper(doi) for doi in dois]
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return str(tmp_path / "manifest.sqlite")
+
+
+def vivo_strings(vivo):
+    with vivo.store_lock:
+        return {str(obj) for obj in vivo.dataset.objects()}
+
+
+def manifest_uris(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {uri for (uri,) in conn.execute("SELECT pub_uri FROM publications")}
+    finally:
+        conn.close()
+
+
+def test_split_owned_triples():
+    pub = f"<{stv.VIVO_BASE}pub-abc>"
+    authorship = f"<{stv.VIVO_BASE}authorship-abc>"
+    person = f"<{stv.VIVO_BASE}person-xyz>"
+    ntriples = "\n".join(
+        [
+            f'{pub} <http://www.w3.org/2000/01/rdf-schema#label> "Title" .',
+            f"{authorship} <http://vivoweb.org/ontology/core#relates> {person} .",
+            f'{person} <http://www.w3.org/2000/01/rdf-schema#label> "Name" .',
+            f'{pub} <http://www.w3.org/2000/01/rdf-schema#label> "Title" .',
+            "",
+        ]
+    )
+
+    pub_uri, owned, shared = stv.split_owned_triples(ntriples)
+
+    assert pub_uri == pub[1:-1]
+    assert owned == sorted({ntriples.splitlines()[0], ntriples.splitlines()[1]})
+    assert shared == [ntriples.splitlines()[2]]
+
+
+def tally_count(vivo):
+    with vivo.store_lock:
+        return len(list(vivo.dataset.triples((None, stv.TALLY_PROPERTIES["total"], None))))
+
+
+def test_unchanged_papers_send_nothing(vivo, scite, dois, manifest):
+    assert stv.sync_to_vivo(dois, "", "", manifest)
+    triples = vivo.snapshot()["triples"]
+    requests = vivo.snapshot()["update_requests"]
+    assert triples > 0
+    assert len(manifest_uris(manifest)) == len(dois)
+
+    assert stv.sync_to_vivo(dois, "", "", manifest)
+    assert vivo.snapshot()["update_requests"] == requests
+    assert vivo.snapshot()["triples"] == triples
+
+
+def test_changed_paper_replaces_its_triples(vivo, scite, dois, papers, manifest, monkeypatch):
+    stv.sync_to_vivo(dois, "", "", manifest)
+    paper = scite.corpus.paper
+
+    def retitled(doi):
+        return {**paper(doi), "title": "A completely new title"} if doi == dois[0] else paper(doi)
+
+    monkeypatch.setattr(scite.corpus, "paper", retitled)
+
+    assert stv.sync_to_vivo(dois, "", "", manifest)
+
+    strings = vivo_strings(vivo)
+    assert "A completely new title" in strings
+    assert papers[0]["title"] not in strings
+
+
+def test_prune_removes_papers_no_longer_listed(vivo, scite, dois, papers, manifest):
+    stv.sync_to_vivo(dois, "", "", manifest)
+
+    assert stv.sync_to_vivo(dois[:-1], "", "", manifest, prune=True)
+
+    assert papers[-1]["title"] not in vivo_strings(vivo)
+    assert papers[0]["title"] in vivo_strings(vivo)
+    assert len(manifest_uris(manifest)) == len(dois) - 1
+
+
+def test_failed_tallies_keep_previous_counts(vivo, scite, dois, manifest, monkeypatch):
+    stv.sync_to_vivo(dois, "", "", manifest)
+    counts = tally_count(vivo)
+    assert counts == len(dois)
+    requests = vivo.snapshot()["update_requests"]
+
+    def failing_tallies(dois, use_cached=True, failed=None):
+        failed.extend(dois)
+        return {}
+
+    monkeypatch.setattr(stv, "fetch_tallies", failing_tallies)
+
+    assert not stv.sync_to_vivo(dois, "", "", manifest)
+    assert vivo.snapshot()["update_requests"] == requests
+    assert tally_count(vivo) == counts
+
+
+def test_failed_paper_batch_is_not_pruned(vivo, scite, dois, manifest, monkeypatch):
+    monkeypatch.setattr(stv, "SCITE_BATCH_SIZE", 5)
+    stv.sync_to_vivo(dois, "", "", manifest)
+    triples = vivo.snapshot()["triples"]
+    post = stv.scite_session.post
+
+    def failing_post(url, json=None, **kwargs):
+        if url.endswith("/papers") and dois[0] in json:
+            raise stv.requests.exceptions.ConnectionError("connection reset")
+        return post(url, json=json, **kwargs)
+
+    monkeypatch.setattr(stv.scite_session, "post", failing_post)
+
+    assert not stv.sync_to_vivo(dois, "", "", manifest, prune=True)
+    assert vivo.snapshot()["triples"] == triples
+    assert len(manifest_uris(manifest)) == len(dois)
+
+
+def test_failed_import_leaves_manifest_untouched(
+    vivo, scite, dois, manifest, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)  # The failed batches backup is written to the working directory
+    vivo.fail_every = 1
+
+    assert not stv.sync_to_vivo(dois, "", "", manifest)
+    assert manifest_uris(manifest) == set()
+
+    vivo.fail_every = 0
+    assert stv.sync_to_vivo(dois, "", "", manifest)
+    assert len(manifest_uris(manifest)) == len(dois)
@@ -0,0 +1,93 @@
+"""Batched Scite tallies with a per-DOI fallback, and refreshing the counts already in VIVO"""
+
+import requests
+from rdflib import URIRef
+
+import scite_to_vivo as stv
+
+
+def test_batch_endpoint_fetches_all_tallies(scite, dois):
+    tallies = stv.fetch_tallies(dois)
+
+    assert tallies == {doi: scite.corpus.tallies(doi) for doi in dois}
+    assert scite.stats["tallies_requests"] == 1
+    assert scite.stats["tally_requests"] == 0
+
+
+def test_missing_batch_endpoint_falls_back_per_doi(scite, dois):
+    scite.batch_tallies = False
+
+    assert stv.fetch_tallies(dois) == {doi: scite.corpus.tallies(doi) for doi in dois}
+    assert stv.fetch_tallies(dois[:5]) == {doi: scite.corpus.tallies(doi) for doi in dois[:5]}
+    assert scite.stats["tally_requests"] == len(dois) + 5
+
+
+def test_failed_batch_only_refetches_its_own_dois(scite, dois, monkeypatch):
+    monkeypatch.setattr(stv, "SCITE_BATCH_SIZE", 5)
+    post = stv.scite_session.post
+    calls = []
+
+    def flaky_post(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            raise requests.exceptions.ConnectionError("connection reset")
+        return post(*args, **kwargs)
+
+    monkeypatch.setattr(stv.scite_session, "post", flaky_post)
+    tallies = stv.fetch_tallies(dois)
+
+    assert tallies == {doi: scite.corpus.tallies(doi) for doi in dois}
+    assert scite.stats["tallies_requests"] == len(dois) // 5 - 1
+    assert scite.stats["tally_requests"] == 5
+    assert stv._batch_tallies_supported
+
+
+def test_failed_requests_are_reported(scite, dois):
+    scite.error_rate = 1.0
+    failed = []
+
+    assert stv.fetch_tallies(dois, failed=failed) == {}
+    assert sorted(failed) == sorted(dois)
+
+
+def vivo_triples(vivo):
+    with vivo.store_lock:
+        return set(vivo.dataset.triples((None, None, None)))
+
+
+def test_refresh_replaces_only_changed_counts(vivo, scite, dois, tmp_path, monkeypatch):
+    stv.sync_to_vivo(dois, "", "", str(tmp_path / "manifest.sqlite"))
+    before = vivo_triples(vivo)
+    tallies = scite.corpus.tallies
+
+    def cited_again(doi):
+        counts = tallies(doi)
+        return {**counts, "total": counts["total"] + 1} if doi == dois[0] else counts
+
+    monkeypatch.setattr(scite.corpus, "tallies", cited_again)
+
+    assert stv.refresh_tallies(dois[:5], "", "")
+
+    pub = URIRef(stv.create_uri("pub-", stv.normalize_doi(dois[0])))
+    changed = before ^ vivo_triples(vivo)
+    assert {(s, p) for s, p, o in changed} == {(pub, stv.TALLY_PROPERTIES["total"])}
+    assert sorted(int(o) for s, p, o in changed) == [
+        tallies(dois[0])["total"], tallies(dois[0])["total"] + 1
+    ]
+
+
+def test_refresh_keeps_counts_it_could_not_fetch(vivo, scite, dois, tmp_path, monkeypatch):
+    stv.sync_to_vivo(dois, "", "", str(tmp_path / "manifest.sqlite"))
+    before = vivo_triples(vivo)
+    requests = vivo.snapshot()["update_requests"]
+
+    def failing_tallies(dois, use_cached=True, failed=None):
+        failed.extend(dois)
+        return {}
+
+    monkeypatch.setattr(stv, "fetch_tallies", failing_tallies)
+
+    assert not stv.refresh_tallies(None, "", "")
+
+    assert vivo.snapshot()["update_requests"] == requests
+    assert vivo_triples(vivo) == before
@@ -0,0 +1,103 @@
+"""Batched VIVO imports: splitting on 413s and timeouts, failing fast on client errors"""
+
+import scite_to_vivo as stv
+
+
+def make_triples(count, width=50):
+    return [
+        f'<http://example.org/s{i}> <http://example.org/p> "{"x" * width}" .' for i in range(count)
+    ]
+
+
+def test_import_stores_every_triple(vivo):
+    failed = stv.import_to_vivo(["\n".join(make_triples(300))], "", "")
+    assert failed == []
+    assert vivo.snapshot()["triples"] == 300
+
+
+def test_413_splits_batch_until_it_fits(vivo, monkeypatch):
+    monkeypatch.setattr(stv, "VIVO_BATCH_TRIPLES", 1000)
+    monkeypatch.setattr(stv, "VIVO_MIN_BATCH_TRIPLES", 10)
+    vivo.max_bytes = 20000
+
+    failed = stv.import_to_vivo(["\n".join(make_triples(1000))], "", "")
+
+    stats = vivo.snapshot()
+    assert failed == []
+    assert stats["rejected_size"] > 0
+    assert stats["triples"] == 1000
+
+
+def test_413_at_minimum_size_is_not_retried(vivo, monkeypatch):
+    monkeypatch.setattr(stv, "VIVO_BATCH_TRIPLES", 20)
+    monkeypatch.setattr(stv, "VIVO_MIN_BATCH_TRIPLES", 20)
+    vivo.max_bytes = 500
+
+    failed = stv.import_to_vivo(["\n".join(make_triples(20))], "", "")
+
+    assert [len(batch) for batch in failed] == [20]
+    assert vivo.snapshot()["update_requests"] == 1
+
+
+def test_timeout_splits_batch(monkeypatch):
+    monkeypatch.setattr(stv, "VIVO_BATCH_TRIPLES", 400)
+    monkeypatch.setattr(stv, "VIVO_MIN_BATCH_TRIPLES", 10)
+    sizes = []
+
+    def fake_post(update, email, password):
+        size = update.count("<http://example.org/p>")
+        sizes.append(size)
+        return 408 if size > 100 else 200
+
+    monkeypatch.setattr(stv, "post_sparql_update", fake_post)
+    failed = stv.import_to_vivo(["\n".join(make_triples(400))], "", "")
+
+    assert failed == []
+    assert sizes[:3] == [400, 200, 100]
+    assert sum(size for size in sizes if size <= 100) == 400
+
+
+def test_other_errors_retry_then_fail(monkeypatch):
+    monkeypatch.setattr(stv, "VIVO_BATCH_TRIPLES", 50)
+    calls = []
+    monkeypatch.setattr(stv, "post_sparql_update", lambda *args: calls.append(1) or 500)
+
+    failed = stv.import_to_vivo(["\n".join(make_triples(50))], "", "")
+
+    assert [len(batch) for batch in failed] == [50]
+    assert len(calls) == stv.VIVO_MAX_RETRIES
+
+
+def test_client_errors_are_not_retried(monkeypatch):
+    monkeypatch.setattr(stv, "VIVO_BATCH_TRIPLES", 50)
+    calls = []
+    monkeypatch.setattr(stv, "post_sparql_update", lambda *args: calls.append(1) or 400)
+
+    failed = stv.import_to_vivo(["\n".join(make_triples(100))], "", "")
+
+    assert [len(batch) for batch in failed] == [50, 50]
+    assert len(calls) == 2
+
+
+def test_rejected_credentials_stop_the_import(vivo, monkeypatch):
+    monkeypatch.setattr(stv, "VIVO_BATCH_TRIPLES", 50)
+    vivo.password = "secret"
+
+    failed = stv.import_to_vivo(["\n".join(make_triples(200))], "", "wrong")
+
+    assert [len(batch) for batch in failed] == [50, 50, 50, 50]
+    assert vivo.snapshot()["update_requests"] == 1
+
+
+def test_batch_bytes_count_encoded_size(monkeypatch):
+    monkeypatch.setattr(stv, "VIVO_BATCH_TRIPLES", 1000)
+    monkeypatch.setattr(stv, "VIVO_MAX_BATCH_BYTES", 1000)
+    line = '<http://example.org/s> <http://example.org/p> "' + "é" * 100 + '" .'
+    sizes = []
+    monkeypatch.setattr(
+        stv, "post_sparql_update", lambda update, *args: sizes.append(update.count("é")) or 200
+    )
+
+    assert stv.import_to_vivo(["\n".join([line] * 20)], "", "") == []
+    # Each line is 150 characters but 250 bytes, so four lines fill a 1000-byte batch
+    assert sizes == [400] * 5
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Local VIVO SPARQL endpoint stand-in
+
+Accepts the same form posts as VIVO and applies them to an in-memory rdflib
+store, so chunked imports, delta sync and tallies refresh can be exercised
+without VIVO/Tomcat:
+
+    POST /api/sparqlUpdate   update=...&email=...&password=...
+    POST /api/sparqlQuery    query=...&email=...&password=...  (SPARQL JSON results)
+    GET  /stats              request, byte and triple counters as JSON
+
+Latency, request size limits and failures can be injected deterministically.
+
+Usage:
+    python vivo_stub.py --port 8080 --password secret --latency-per-kb 0.001
+    python vivo_stub.py --port 8080 --max-bytes 1000000 --fail-every 7 --dump vivo.nq
+    VIVO_BASE_URL=http://localhost:8080/vivo VIVO_PASSWORD=secret python scite_to_vivo.py ...
+"""
+
+import argparse
+import gzip
+import json
+import random
+import re
+import sys
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+from rdflib import Dataset, Graph, URIRef
+
+from stub_server import StubHandler, StubServer, serve_until_stopped
+
+# scite_to_vivo.py appends these to VIVO_BASE_URL
+UPDATE_PATH = "/api/sparqlUpdate"
+QUERY_PATH = "/api/sparqlQuery"
+
+# INSERT/DELETE DATA of N-Triples into one graph, as sent by data_update(); these
+# skip rdflib's SPARQL parser, which is far slower than its N-Triples parser
+DATA_UPDATE = re.compile(
+    r"^\s*(INSERT|DELETE)\s+DATA\s*\{\s*GRAPH\s*<([^>]*)>\s*\{(.*)\}\s*\}\s*$", re.DOTALL
+)
+
+
+class VivoStubServer(StubServer):
+    """Threaded SPARQL endpoint over one rdflib Dataset, with fault injection."""
+
+    def __init__(
+        self,
+        address,
+        base_path: str = "/vivo",
+        email: Optional[str] = None,
+        password: Optional[str] = None,
+        latency: float = 0.0,
+        latency_per_kb: float = 0.0,
+        max_bytes: int = 0,
+        error_rate: float = 0.0,
+        fail_every: int = 0,
+        seed: int = 0,
+        store: bool = True,
+    ):
+        super().__init__(address, VivoStubHandler)
+        self.base_path = base_path.rstrip("/")
+        self.email = email
+        self.password = password
+        self.latency = latency
+        self.latency_per_kb = latency_per_kb
+        self.max_bytes = max_bytes
+        self.error_rate = error_rate
+        self.fail_every = fail_every
+        self.store = store
+        self.dataset = Dataset(default_union=True)
+        self.store_lock = threading.Lock()
+        self.error_rng = random.Random(seed)
+
+    @property
+    def url(self) -> str:
+        """Value for VIVO_BASE_URL."""
+        return super().url + self.base_path
+
+    def should_fail(self) -> bool:
+        """Fail every Nth update and/or a seeded random fraction of them."""
+        with self.lock:
+            self.stats["updates_seen"] += 1
+            if self.fail_every and self.stats["updates_seen"] % self.fail_every == 0:
+                return True
+            return self.error_rng.random() < self.error_rate
+
+    def apply_update(self, update: str) -> None:
+        match = DATA_UPDATE.match(update)
+        if not match:
+            with self.store_lock:
+                self.dataset.update(update)
+            return
+        operation, graph_uri, ntriples = match.groups()
+        triples = Graph().parse(data=ntriples, format="nt")
+        with self.store_lock:
+            graph = self.dataset.graph(URIRef(graph_uri))
+            for triple in triples:
+                if operation == "INSERT":
+                    graph.add(triple)
+                else:
+                    graph.remove(triple)
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            stats = dict(self.stats)
+        with self.store_lock:
+            stats["triples"] = len(self.dataset)
+        return stats
+
+
+class VivoStubHandler(StubHandler):
+    def respond(self, status: int, body: str = "", content_type: str = "text/plain") -> None:
+        self.send(status, body.encode(), content_type)
+
+    def read_form(self) -> Dict[str, str]:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.count("bytes_received", len(body))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+
+    def authorized(self, form: Dict[str, str]) -> bool:
+        server = self.server
+        if server.email and form.get("email") != server.email:
+            return False
+        return not server.password or form.get("password") == server.password
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self.respond(200, json.dumps(self.server.snapshot()), "application/json")
+        else:
+            self.respond(404, "not found")
+
+    def do_POST(self):
+        server = self.server
+        size = int(self.headers.get("Content-Length", 0))
+        form = self.read_form()
+        if self.path == server.base_path + UPDATE_PATH:
+            self.handle_update(form, size)
+        elif self.path == server.base_path + QUERY_PATH:
+            self.handle_query(form)
+        else:
+            self.respond(404, "not found")
+
+    def handle_update(self, form: Dict[str, str], size: int) -> None:
+        server = self.server
+        server.count("update_requests")
+        if not self.authorized(form):
+            server.count("rejected_auth")
+            self.respond(403, "Unauthorized")
+            return
+        if "update" not in form:
+            self.respond(400, "missing update parameter")
+            return
+        if server.max_bytes and size > server.max_bytes:
+            server.count("rejected_size")
+            self.respond(413, f"Request of {size} bytes exceeds {server.max_bytes}")
+            return
+
+        wait = server.latency + server.latency_per_kb * size / 1024
+        if wait:
+            time.sleep(wait)
+        if server.should_fail():
+            server.count("injected_failures")
+            self.respond(500, "Injected failure")
+            return
+
+        if server.store:
+            try:
+                server.apply_update(form["update"])
+            except Exception as e:
+                server.count("bad_updates")
+                self.respond(400, f"Could not apply update: {e}")
+                return
+        server.count("updates_applied")
+        self.respond(200, "OK")
+
+    def handle_query(self, form: Dict[str, str]) -> None:
+        server = self.server
+        server.count("query_requests")
+        if not self.authorized(form):
+            self.respond(403, "Unauthorized")
+            return
+        if "query" not in form:
+            self.respond(400, "missing query parameter")
+            return
+        if server.latency:
+            time.sleep(server.latency)
+        try:
+            with server.store_lock:
+                result = server.dataset.query(form["query"])
+                body = result.serialize(format="json").decode("utf-8")
+        except Exception as e:
+            self.respond(400, f"Could not run query: {e}")
+            return
+        self.respond(200, body, "application/sparql-results+json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local VIVO SPARQL endpoint stand-in")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--base-path", default="/vivo", help="VIVO context path (default: /vivo)")
+    parser.add_argument("--email", help="Require this admin email")
+    parser.add_argument("--password", help="Require this admin password")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument(
+        "--latency-per-kb", type=float, default=0.0, help="Extra seconds per KB of update body"
+    )
+    parser.add_argument(
+        "--max-bytes", type=int, default=0, help="Reject larger updates with 413 (0: no limit)"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fraction of updates answered with 500"
+    )
+    parser.add_argument("--fail-every", type=int, default=0, help="Fail every Nth update with 500")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --error-rate")
+    parser.add_argument(
+        "--no-store",
+        action="store_true",
+        help="Accept updates without applying them (measures the client, not rdflib)",
+    )
+    parser.add_argument("--dump", help="Write the store as N-Quads to this file on exit")
+    args = parser.parse_args()
+
+    server = VivoStubServer(
+        (args.host, args.port),
+        args.base_path,
+        args.email,
+        args.password,
+        args.latency,
+        args.latency_per_kb,
+        args.max_bytes,
+        args.error_rate,
+        args.fail_every,
+        args.seed,
+        not args.no_store,
+    )
+    print(f"✓ VIVO stub listening on {server.url}", file=sys.stderr)
+    try:
+        serve_until_stopped(server)
+    finally:
+        print(f"Stats: {server.snapshot()}", file=sys.stderr)
+        if args.dump:
+            server.dataset.serialize(destination=args.dump, format="nquads")
+            print(f"✓ Saved store to {args.dump}", file=sys.stderr)
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()